@@ -0,0 +1 @@
+"""Benchmarks of the logging hot paths, see `micro` and `workload`."""
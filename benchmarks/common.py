@@ -0,0 +1,81 @@
+"""Timing, reporting and regression checks shared by the benchmarks."""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from datetime import datetime
+
+
+def measure(fn, number, repeat=5):
+    """Returns the best time per call of `fn`, in nanoseconds, over `repeat`
+    runs of `number` calls.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter_ns() - start) / number)
+    return best
+
+
+def get_parser(description):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="a JSON file of previous results")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="relative slow-down reported as a regression (default: 0.2)",
+    )
+    parser.add_argument("-k", dest="select", help="only run benchmarks matching")
+    return parser
+
+
+class Report:
+    """Collects named results, each a dict with at least an `ns` field."""
+
+    def __init__(self, suite):
+        self.suite = suite
+        self.results = {}
+
+    def add(self, name, ns, **fields):
+        self.results[name] = {"ns": ns, **fields}
+        extra = "  ".join(f"{k}={v:,}" for k, v in fields.items())
+        print(f"{name:<52} {ns:>14,.0f} ns  {extra}", flush=True)
+
+    def to_dict(self):
+        return {
+            "suite": self.suite,
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "results": self.results,
+        }
+
+    def finish(self, args):
+        """Writes the results and compares them to previous ones. Returns the
+        exit code, 1 if there are regressions.
+        """
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(self.to_dict(), f, indent=2)
+        if not args.compare:
+            return 0
+
+        with open(args.compare) as f:
+            previous = json.load(f)["results"]
+        regressions = []
+        for name, result in self.results.items():
+            if name not in previous:
+                continue
+            ratio = result["ns"] / previous[name]["ns"]
+            if ratio > 1 + args.tolerance:
+                regressions.append((name, ratio))
+
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {ratio:.2f}x slower")
+        return 1 if regressions else 0
@@ -0,0 +1,206 @@
+"""Micro-benchmarks of the logging hot paths. Run them from the repository
+root with `python -m benchmarks.micro --out micro.json` and compare a later
+run against it with `--compare micro.json`.
+"""
+
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import rlog
+from rlog.formatters import SummaryFormatter
+from rlog.handlers import (
+    AsyncHandler,
+    ColumnarHandler,
+    PickleHandler,
+    TensorboardHandler,
+)
+from rlog.metrics import Accumulator, ArrayAccumulator, AvgMetric, SumMetric
+
+from .common import Report, get_parser, measure
+
+# metargs of AvgMetrics reading `reward` and `done`, by kind
+METARGS = {
+    "key": ["reward", "done"],
+    "const": ["reward", 1],
+    "fn": ["clip(reward)", "done"],
+}
+
+
+def dir_size(path):
+    return sum(f.stat().st_size for f in Path(path).rglob("*") if f.is_file())
+
+
+BACKENDS = {"python": Accumulator, "array": ArrayAccumulator}
+
+
+def make_accumulator(n_metrics, kind="key", backend="python"):
+    return BACKENDS[backend](
+        *(AvgMetric(f"m{i}", metargs=METARGS[kind]) for i in range(n_metrics))
+    )
+
+
+def bench_accumulator_trace(report):
+    for n_metrics in (1, 10, 100):
+        for kind in METARGS:
+            acc = make_accumulator(n_metrics, kind)
+            ns = measure(lambda acc=acc: acc.trace(reward=0.5, done=False), 20_000)
+            report.add(f"accumulator.trace[{n_metrics}x{kind}]", ns)
+
+    for n_metrics in (10, 100, 1000):
+        acc = make_accumulator(n_metrics, backend="array")
+        ns = measure(lambda acc=acc: acc.trace(reward=0.5, done=False), 5_000)
+        report.add(f"accumulator.trace[{n_metrics}xkey,array]", ns)
+
+    # keys no metric reads
+    acc = make_accumulator(10)
+    ns = measure(lambda: acc.trace(frame_no=1), 20_000)
+    report.add("accumulator.trace[unread key]", ns)
+
+
+def bench_summarize_reset(report):
+    for backend in BACKENDS:
+        for n_metrics in (10, 100, 1000):
+            acc = make_accumulator(n_metrics, backend=backend)
+            acc.trace(reward=1.0, done=True)
+            name = f"[{n_metrics},{backend}]"
+            report.add(f"accumulator.summarize{name}", measure(acc.summarize, 1_000))
+
+            def summarize_reset(acc=acc):
+                acc.trace(reward=1.0, done=True)
+                acc.summarize()
+                acc.reset()
+
+            report.add(
+                f"accumulator.trace+summarize+reset{name}",
+                measure(summarize_reset, 1_000),
+            )
+
+
+def stream_handler():
+    stream = logging.StreamHandler(open(os.devnull, "w"))  # noqa: SIM115
+    stream.setFormatter(logging.Formatter("{asctime} {name}: {message}", style="{"))
+    return stream
+
+
+HANDLERS = {
+    "none": lambda log_dir: None,
+    "stream": lambda log_dir: stream_handler(),
+    "pickle": lambda log_dir: PickleHandler(log_dir, timestamp=0),
+    "pickle-append": lambda log_dir: PickleHandler(log_dir, timestamp=0, append=True),
+    "columnar": lambda log_dir: ColumnarHandler(log_dir, timestamp=0),
+    "tensorboard": lambda log_dir: TensorboardHandler(log_dir),
+    "async(pickle-append)": lambda log_dir: AsyncHandler(
+        PickleHandler(log_dir, timestamp=0, append=True)
+    ),
+}
+
+
+def get_logger(name, *handlers):
+    """A logger that only writes to `handlers`."""
+    log = rlog.getLogger(name)
+    log.propagate = False
+    log.handlers.clear()
+    for handler in handlers:
+        handler.setLevel(logging.TRACE)
+        log.addHandler(handler)
+    return log
+
+
+def bench_rlogger_trace(report):
+    number = 1_000
+    for name, make_handler in HANDLERS.items():
+        with tempfile.TemporaryDirectory() as log_dir:
+            handler = make_handler(log_dir)
+            handlers = () if handler is None else (handler,)
+            log = get_logger(f"bench.trace.{name}", *handlers)
+
+            step = iter(range(10**9))
+            ns = measure(
+                lambda log=log, step=step: log.trace(
+                    step=next(step), loss=0.5, R=12.0, fps=1e3, err=0.1, eps=0.05
+                ),
+                number,
+                repeat=3,
+            )
+            for handler in handlers:
+                handler.flush()
+                handler.close()
+            written = dir_size(log_dir) // (3 * number)
+            # the whole-file rewrite of "pickle" gets slower as the file grows
+            report.add(f"rlogger.trace[{name}]", ns, bytes_per_call=written)
+
+
+def bench_formatter(report):
+    fmt = SummaryFormatter()
+    for n_metrics in (5, 20):
+        summary = {f"metric_{i}": random.random() for i in range(n_metrics)}
+        ns = measure(lambda summary=summary: fmt(step=1000, **summary), 5_000)
+        report.add(f"summary_formatter[{n_metrics}]", ns)
+
+
+def bench_trace_and_log(report):
+    with tempfile.TemporaryDirectory() as log_dir:
+        log = get_logger(
+            "bench.trace_and_log",
+            stream_handler(),
+            PickleHandler(log_dir, timestamp=0, append=True),
+        )
+        log.addMetrics(
+            SumMetric("ep_cnt", resetable=False, metargs=["done"]),
+            AvgMetric("R_per_ep", metargs=["reward", "done"]),
+            AvgMetric("R_per_step", metargs=["reward", 1]),
+            AvgMetric("rw_per_ep", metargs=["clip(reward)", "done"]),
+        )
+
+        def trace_and_log():
+            log.put(reward=1.0, done=True)
+            log.traceAndLog(1000)
+
+        report.add("rlogger.traceAndLog", measure(trace_and_log, 1_000, repeat=3))
+        for handler in log.handlers:
+            handler.close()
+
+
+def import_time(module):
+    """Returns the time to import `module`, and the packages it is in, in a
+    new interpreter, in nanoseconds.
+    """
+    cmd = [sys.executable, "-X", "importtime", "-c", f"import {module}"]
+    out = subprocess.run(cmd, capture_output=True, text=True, check=True).stderr
+    # the last line is `module`: "import time: self [us] | cumulative | name"
+    return int(out.splitlines()[-1].split("|")[1]) * 1_000
+
+
+def bench_import(report):
+    for module in ("rlog", "rlog.metrics", "rlog.handlers"):
+        ns = min(import_time(module) for _ in range(5))
+        report.add(f"import[{module}]", ns)
+
+
+BENCHMARKS = {
+    "import": bench_import,
+    "accumulator.trace": bench_accumulator_trace,
+    "accumulator.summarize": bench_summarize_reset,
+    "rlogger.trace": bench_rlogger_trace,
+    "summary_formatter": bench_formatter,
+    "rlogger.traceAndLog": bench_trace_and_log,
+}
+
+
+def main():
+    args = get_parser(__doc__).parse_args()
+    rlog.init("bench")
+    report = Report("micro")
+    for name, bench in BENCHMARKS.items():
+        if args.select is None or args.select in name:
+            bench(report)
+    return report.finish(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""A synthetic RL training loop, logging the way `examples/many_loggers.py`
+does, timed for several `rlog.init()` configurations.
+
+The cost of the loop without any logging is measured first and subtracted, so
+the reported `ns` is the logging overhead per environment step. Run it from
+the repository root with `python -m benchmarks.workload --out workload.json`.
+"""
+
+import contextlib
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import rlog
+
+from .common import Report, get_parser
+
+CONFIGS = {
+    "pickle": dict(),
+    "pickle-append": dict(append_pickle=True),
+    "pickle-append+columnar": dict(append_pickle=True, columnar=True),
+    "pickle+tensorboard": dict(tensorboard=True),
+    "async(pickle-append+tensorboard)": dict(
+        append_pickle=True, tensorboard=True, async_io=True
+    ),
+}
+
+
+def env_step(rng, step):
+    reward = 1 if rng.random() < 0.3 else 0
+    done = step % 500 == 0 or rng.random() < 0.002
+    return reward, done
+
+
+def baseline(steps, log_every):
+    rng = random.Random(0)
+    for step in range(1, steps + 1):
+        env_step(rng, step)
+        rng.gauss(0, 0.1)
+        if step % log_every == 0:
+            pass
+
+
+def add_metrics(train_log, eval_log):
+    train_log.addMetrics(
+        rlog.SumMetric("ep_cnt", resetable=False, metargs=["done"]),
+        rlog.AvgMetric("R_per_ep", metargs=["reward", "done"]),
+        rlog.AvgMetric("R_per_step", metargs=["reward", 1]),
+        rlog.AvgMetric("rw_per_ep", metargs=["clip(reward)", "done"]),
+        rlog.FPSMetric("train_fps", metargs=["frame_no"]),
+        rlog.ValueMetric("loss", metargs=["loss"], capacity=1000),
+        rlog.QuantileMetric("q_sample", metargs=["sample"]),
+    )
+    eval_log.addMetrics(
+        rlog.SumMetric("ep_cnt", metargs=["done"]),
+        rlog.AvgMetric("R_per_ep", metargs=["reward", "done"]),
+        rlog.MaxMetric("max_R", metargs=["reward"]),
+    )
+
+
+def workload(steps, log_every):
+    train_log = rlog.getLogger("bench.train")
+    eval_log = rlog.getLogger("bench.eval")
+    add_metrics(train_log, eval_log)
+
+    rng = random.Random(0)
+    for step in range(1, steps + 1):
+        reward, done = env_step(rng, step)
+        sample = rng.gauss(0, 0.1)
+        train_log.put(reward=reward, done=done, frame_no=1, sample=sample)
+        if step % 4 == 0:
+            train_log.put(loss=sample * sample)
+        if step % 10 == 0:
+            eval_log.put(reward=reward, done=done)
+        if step % log_every == 0:
+            train_log.traceAndLog(step)
+            eval_log.traceAndLog(step)
+    rlog.flush()
+
+
+def run_config(config, steps, log_every):
+    with tempfile.TemporaryDirectory() as log_dir:
+        # keep the console handler, but point it to /dev/null
+        with open(os.devnull, "w") as devnull:
+            with contextlib.redirect_stdout(devnull):
+                rlog.init("bench", path=log_dir, timestamp=0, **config)
+            start = time.perf_counter_ns()
+            workload(steps, log_every)
+            elapsed = time.perf_counter_ns() - start
+            for handler in rlog.getRootLogger().handlers:
+                handler.close()
+        written = sum(f.stat().st_size for f in Path(log_dir).rglob("*") if f.is_file())
+    # start from fresh loggers in the next configuration
+    for name in ("bench.train", "bench.eval"):
+        logging.Logger.manager.loggerDict.pop(name, None)
+    return elapsed, written
+
+
+def main():
+    parser = get_parser(__doc__)
+    parser.add_argument("--steps", type=int, default=1_000_000)
+    parser.add_argument("--log-every", type=int, default=10_000)
+    args = parser.parse_args()
+
+    start = time.perf_counter_ns()
+    baseline(args.steps, args.log_every)
+    base_ns = (time.perf_counter_ns() - start) / args.steps
+
+    report = Report("workload")
+    report.add("baseline (no logging)", base_ns)
+    for name, config in CONFIGS.items():
+        if args.select is not None and args.select not in name:
+            continue
+        elapsed, written = run_config(config, args.steps, args.log_every)
+        report.add(
+            f"workload[{name}]",
+            elapsed / args.steps - base_ns,
+            bytes_written=written,
+        )
+    return report.finish(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
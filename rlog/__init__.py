@@ -1 +1,62 @@
+import importlib
+
+from . import rlogger
 from .rlogger import *
+from .rlogger import __all__ as _rlogger_all
+
+# Loaded on first access, so that `import rlog` stays cheap for short scripts.
+_LAZY = {
+    "AsyncHandler": "handlers",
+    "BufferedFileHandler": "handlers",
+    "ColumnarHandler": "handlers",
+    "PickleHandler": "handlers",
+    "TensorboardHandler": "handlers",
+    "handle_batch": "handlers",
+    "read_columns": "handlers",
+    "read_pickle": "handlers",
+    "ForwardingHandler": "forwarding",
+    "ForwardingListener": "forwarding",
+    "load": "readers",
+    "register_function": "expressions",
+    "Accumulator": "metrics",
+    "ArrayAccumulator": "metrics",
+    "AvgMetric": "metrics",
+    "EpisodicMetric": "metrics",
+    "EWMAvgMetric": "metrics",
+    "FPSMetric": "metrics",
+    "MaxMetric": "metrics",
+    "QuantileMetric": "metrics",
+    "SumMetric": "metrics",
+    "TimerMetric": "metrics",
+    "ValueMetric": "metrics",
+    "WindowAvgMetric": "metrics",
+    "WindowEpisodicMetric": "metrics",
+}
+
+_SUBMODULES = (
+    "expressions",
+    "forwarding",
+    "handlers",
+    "metrics",
+    "readers",
+    "tensorboard",
+)
+
+__all__ = [*_rlogger_all, *_LAZY]
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        # importing a submodule also sets it as an attribute of the package
+        return importlib.import_module(f".{name}", __name__)
+    try:
+        module = _LAZY[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = rlogger._import(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY, *_SUBMODULES})
@@ -1,10 +1,10 @@
 import sys
 import traceback
 
-from termcolor import colored as clr
-
 
 def print_fancy_err(err, issue=None, fix=None):
+    from termcolor import colored as clr
+
     _, _, exc_tb = sys.exc_info()
     tb = traceback.extract_tb(exc_tb)
     stack = traceback.extract_stack()
@@ -0,0 +1,168 @@
+"""Compiles the metargs of the metrics into functions of the traced values.
+
+A metarg is either a number, the name of a traced value, or an expression of
+traced values such as `"clip(reward, -1, 1)"`, `"reward * (1 - done)"` or
+`"abs(td_err)"`. Only strings with a parenthesis are expressions, others such
+as `"loss/td"` or `"q-value"` are keys. Expressions are parsed once, when
+metrics are added to an `Accumulator`, into a single compiled function reading
+the values from the keyword arguments of `Accumulator.trace`.
+"""
+
+import ast
+import functools
+import operator
+
+__all__ = ["compile_metarg", "register_function"]
+
+
+def clip(x, lo=-1, hi=1):
+    return max(min(hi, x), lo)
+
+
+def _vclip(x, lo=-1, hi=1):
+    import numpy as np
+
+    return np.clip(x, lo, hi)
+
+
+def _vint(x):
+    import numpy as np
+
+    return np.asarray(x).astype(np.int64)
+
+
+def _vfloat(x):
+    import numpy as np
+
+    return np.asarray(x).astype(np.float64)
+
+
+def _vmin(*args):
+    import numpy as np
+
+    return functools.reduce(np.minimum, args)
+
+
+def _vmax(*args):
+    import numpy as np
+
+    return functools.reduce(np.maximum, args)
+
+
+FNS = {
+    "abs": abs,
+    "clip": clip,
+    "float": float,
+    "int": int,
+    "max": max,
+    "min": min,
+}
+VFNS = {  # for arrays, used by `trace_batch`
+    "abs": abs,
+    "clip": _vclip,
+    "float": _vfloat,
+    "int": _vint,
+    "max": _vmax,
+    "min": _vmin,
+}
+
+# the syntax allowed in expressions, the rest is refused
+_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Compare,
+    ast.Call,
+    ast.Name,
+    ast.Load,
+    ast.Constant,
+    ast.operator,
+    ast.unaryop,
+    ast.cmpop,
+)
+
+
+def register_function(name, fn, vectorized=None):
+    """Makes `fn` callable in metargs, as `name(...)`. `vectorized` is used
+    instead by `trace_batch`, where the arguments are NumPy arrays, and
+    defaults to `fn`. Register functions before adding the metrics using them.
+    """
+    FNS[name] = fn
+    VFNS[name] = fn if vectorized is None else vectorized
+    compile_metarg.cache_clear()
+
+
+def _constant(value):
+    def get(kwargs):
+        return value
+
+    return get
+
+
+class _Loader(ast.NodeTransformer):
+    """Replaces the names of traced values with `kwargs[name]`."""
+
+    def __init__(self, metarg, fns):
+        self.metarg = metarg
+        self.fns = fns
+        self.keys = []
+
+    def generic_visit(self, node):
+        if not isinstance(node, _NODES):
+            raise ValueError(
+                f"Unsupported syntax `{type(node).__name__}` in metarg `{self.metarg}`."
+            )
+        return super().generic_visit(node)
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.keywords:
+            raise ValueError(f"Unsupported call in metarg `{self.metarg}`.")
+        if node.func.id not in self.fns:
+            raise ValueError(
+                f"Unknown function `{node.func.id}` in metarg `{self.metarg}`, "
+                "see `rlog.register_function()`."
+            )
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def visit_Name(self, node):
+        if node.id not in self.keys:
+            self.keys.append(node.id)
+        key = ast.Constant(node.id)
+        return ast.copy_location(
+            ast.Subscript(ast.Name("kwargs", ast.Load()), key, ast.Load()), node
+        )
+
+
+@functools.cache
+def compile_metarg(metarg, vectorized=False):
+    """Turns a metarg into a function reading its value from the `kwargs` of
+    `Accumulator.trace`. Returns the function and the keys it reads.
+
+    Strings without a parenthesis are plain keys, even when they would parse
+    as expressions, like `"loss/td"`.
+    """
+    if isinstance(metarg, int | float):
+        return _constant(metarg), ()
+    if "(" not in metarg:
+        # a key such as "reward", "lorem ipsum" or "loss/td"
+        return operator.itemgetter(metarg), (metarg,)
+    try:
+        tree = ast.parse(metarg.strip(), mode="eval")
+    except SyntaxError as err:
+        raise ValueError(f"Invalid expression in metarg `{metarg}`.") from err
+
+    fns = VFNS if vectorized else FNS
+    loader = _Loader(metarg, fns)
+    body = loader.visit(tree).body
+    args = ast.arguments(
+        posonlyargs=[],
+        args=[ast.arg("kwargs")],
+        kwonlyargs=[],
+        kw_defaults=[],
+        defaults=[],
+    )
+    fn = ast.fix_missing_locations(ast.Expression(ast.Lambda(args, body)))
+    code = compile(fn, f"<metarg {metarg}>", "eval")
+    # only the registered functions are reachable from the expression
+    return eval(code, {"__builtins__": {}, **fns}), tuple(loader.keys)
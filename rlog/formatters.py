@@ -9,19 +9,50 @@
 
 
 class SummaryFormatter:
-    def __init__(self):
-        pass
-
-    def _compute_string_format(self, summary):
-        to_string = {
-            k: v
-            for k, v in summary.items()
-            if (v is not None) and (type(v) not in (list, tuple, dict))
-        }
-        to_string.pop("step")
-        fmt = ", ".join([f"{k}={{{k}:2.2f}}" for k in to_string])
-        return "[{step:06d}] " + fmt
+    """Formats summaries as `[step] metric=value, ...` lines.
+
+    `specs` maps metric names to format specs, such as `{"loss": ".4f"}`, the
+    others use "2.2f". The metrics in `metrics` with `emph=True` are printed
+    first, apart from the others. Values that are None, lists or dicts are
+    left out.
+
+    The format string is compiled once for each set of keys and value types
+    and cached, so formatting a summary is a single `str.format` call.
+    """
+
+    SKIPPED = (type(None), list, tuple, dict)
+
+    def __init__(self, specs=None, metrics=None):
+        self.specs = dict(specs or {})
+        self.metrics = {} if metrics is None else metrics
+        self._plans = {}
+
+    def set_specs(self, **specs):
+        """Sets the format spec of some metrics, e.g. `set_specs(loss=".4f")`."""
+        self.specs.update(specs)
+        self._plans.clear()
+
+    def _compile(self, summary):
+        keys = [
+            k for k, v in summary.items() if k != "step" and type(v) not in self.SKIPPED
+        ]
+        emph = [k for k in keys if getattr(self.metrics.get(k), "emph", False)]
+        fields = {k: i for i, k in enumerate(keys, 1)}
+
+        def field(k):
+            name = k.replace("{", "{{").replace("}", "}}")
+            return f"{name}={{{fields[k]}:{self.specs.get(k, '2.2f')}}}"
+
+        rest = ", ".join(field(k) for k in keys if k not in emph)
+        fmt = "[{0:06d}] " + ", ".join(field(k) for k in emph)
+        if emph and rest:
+            fmt += " | "
+        return fmt + rest, keys
 
     def __call__(self, **summary):
-        fmt = self._compute_string_format(summary)
-        return fmt.format(**summary)
+        key = tuple(summary), tuple(map(type, summary.values()))
+        try:
+            fmt, keys = self._plans[key]
+        except KeyError:
+            fmt, keys = self._plans[key] = self._compile(summary)
+        return fmt.format(summary["step"], *[summary[k] for k in keys])
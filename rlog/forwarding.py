@@ -0,0 +1,115 @@
+"""Forwarding the records of worker processes to the handlers of the parent."""
+
+import atexit
+import logging
+import threading
+from multiprocessing import util
+
+__all__ = ["ForwardingHandler", "ForwardingListener"]
+
+
+_FORMATTER = logging.Formatter()
+
+
+class ForwardingHandler(logging.Handler):
+    """A Handler that sends records to another process through `queue`.
+
+    Records are sent in batches, a `queue.put()` for every `batch_size`
+    records, or sooner if `flush_secs` passed since the last batch or for
+    records of level WARNING and above. What is left is sent on `flush()`,
+    `close()` or when the process exits.
+    """
+
+    handles_schemas = True  # for the handlers of the other process
+
+    def __init__(self, queue, batch_size=64, flush_secs=1.0):
+        logging.Handler.__init__(self)
+        self.queue = queue
+        self.batch_size = batch_size
+        self.flush_secs = flush_secs
+        self._batch = []
+        self._last_sent = 0.0
+        self._finalizer = None
+        atexit.register(self.flush)
+
+    def prepare(self, record):
+        """Makes the record picklable, like `logging.handlers.QueueHandler`
+        does, but keeps the dict messages of structured records as they are.
+        """
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = _FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self._batch.append(self.prepare(record))
+            if (
+                len(self._batch) >= self.batch_size
+                or record.levelno >= logging.WARNING
+                or record.created - self._last_sent >= self.flush_secs
+            ):
+                self._send(record.created)
+        except Exception:
+            self.handleError(record)
+
+    def emit_batch(self, records):
+        """Sends `records` with the batch being collected, in a single put."""
+        self._batch.extend(self.prepare(record) for record in records)
+        self._send(records[-1].created)
+
+    def _send(self, now):
+        if self._finalizer is None:
+            # Multiprocessing children exit without running atexit, and drop
+            # the finalizers registered before they start. This one runs
+            # before the queue's own, which stop sending.
+            self._finalizer = util.Finalize(self, self.flush, exitpriority=100)
+        batch, self._batch = self._batch, []
+        self._last_sent = now
+        self.queue.put(batch)
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._batch:
+                self._send(self._last_sent)
+        finally:
+            self.release()
+
+    def close(self):
+        atexit.unregister(self.flush)
+        self.flush()
+        logging.Handler.close(self)
+
+
+class ForwardingListener:
+    """Passes the batches of records received on `queue` to the loggers of
+    this process, whose handlers are then the only ones writing the files.
+    """
+
+    def __init__(self, queue):
+        self.queue = queue
+        self._thread = threading.Thread(
+            target=self._listen, name="rlog-listener", daemon=True
+        )
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def _listen(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                return
+            for record in batch:
+                logging.getLogger(record.name).handle(record)
+
+    def stop(self):
+        """Handles the records already received and stops the thread."""
+        atexit.unregister(self.stop)
+        if self._thread.is_alive():
+            self.queue.put(None)
+            self._thread.join()
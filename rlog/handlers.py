@@ -1,71 +1,153 @@
 """Extra Handlers that can handle structured LogRecords."""
 
+import atexit
+import json
 import logging
+import numbers
+import os
 import pickle
+import queue
+import threading
+import weakref
+from array import array
 from datetime import datetime
+from multiprocessing import util
 from pathlib import Path
+from urllib.parse import quote
 
 from .exception_handling import print_fancy_err
 
-try:
-    from torch.utils.tensorboard import SummaryWriter
-except ImportError:
-    # TODO: the project itself should use logging without messing things out.
-    print(
-        "[WARN] rlog: TensorBoard is available in PyTorch-Nightly (~1.1) "
-        + "and it should be available in newer version."
-    )
+__all__ = [
+    "AsyncHandler",
+    "BufferedFileHandler",
+    "ColumnarHandler",
+    "PickleHandler",
+    "TensorboardHandler",
+    "handle_batch",
+    "read_columns",
+    "read_pickle",
+]
 
 
-__all__ = ["PickleHandler", "TensorboardHandler"]
+# Handlers with threads or buffers that a forked child must not inherit.
+_FORK_RESET = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for handler in list(_FORK_RESET):
+        handler._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+def handle_batch(handler, records):
+    """Passes `records` to `handler` like `handler.handle()` does, but under
+    a single lock and to its `emit_batch()` if it has one, so that handlers
+    writing files can write all the records of a batch at once. Schema
+    records are left out unless the handler `handles_schemas`.
+    """
+    if not getattr(handler, "handles_schemas", False):
+        records = [r for r in records if not hasattr(r, "rlog_schema")]
+    records = [r for r in records if r.levelno >= handler.level and handler.filter(r)]
+    if not records:
+        return
+    emit_batch = getattr(handler, "emit_batch", None)
+    handler.acquire()
+    try:
+        if emit_batch is not None:
+            try:
+                emit_batch(records)
+            except Exception:
+                handler.handleError(records[0])
+        else:
+            for record in records:
+                try:
+                    handler.emit(record)
+                except Exception:
+                    handler.handleError(record)
+    finally:
+        handler.release()
 
 
 class PickleHandler(logging.Handler):
     """A Handler that writes `logging.LogRecord`s to pickle files.
-    TODO: Check the performance?
+
+    By default the pickle of a logger is loaded, updated and rewritten on every
+    record, which gets slower as the run goes on. With `append=True` each record
+    is pickled on its own and appended at the end of the file instead, so the
+    cost of a record does not depend on the length of the run. Use
+    `read_pickle()` to load such a file back into a single dict.
+
+    `emit_batch()` writes each file once for all the records of a batch.
     """
 
-    def __init__(self, log_dir, timestamp=None):
+    def __init__(self, log_dir, timestamp=None, append=False):
         logging.Handler.__init__(self)
         self.log_dir = log_dir
         if timestamp is None:
             self.timestamp = int(datetime.timestamp(datetime.now()))
         else:
             self.timestamp = int(timestamp)
+        self.append = append
+        self._files = {}  # logger name -> file opened for appending
 
     def emit(self, record):
-        data = self._maybe_load(record.name)
+        self.emit_batch((record,))
 
-        # these functions mutate `data`!
-        if isinstance(record.msg, dict) and record.levelname == "TRACE":
-            self._add_scalars(record, data)
-        else:
-            # TODO: need to move this in a formatter!!
-            record.msg = str(record.msg)
-            self._add_text(record, data)
+    def emit_batch(self, records):
+        by_logger = {}
+        for record in records:
+            by_logger.setdefault(record.name, []).append(record)
+
+        for logger_name, records_ in by_logger.items():
+            data = {} if self.append else self._maybe_load(logger_name)
+
+            # these functions mutate `data`!
+            for record in records_:
+                if isinstance(record.msg, dict) and record.levelname == "TRACE":
+                    self._add_scalars(record, data)
+                else:
+                    # TODO: need to move this in a formatter!!
+                    record.msg = str(record.msg)
+                    self._add_text(record, data)
+
+            if self.append:
+                self._append(logger_name, data)
+            else:
+                self._save(logger_name, data)
 
-        self._save(record.name, data)
+    def _get_path(self, logger_name):
+        file_name = logger_name.replace(".", "_")
+        return Path(self.log_dir, f"{self.timestamp}_{file_name}.pkl")
 
     def _maybe_load(self, logger_name):
         """For commodity reasons we create a pickle file per logger.
         If a pickle exists it will be loaded in memory.
         """
-        file_name = logger_name.replace(".", "_")
-        file_path = Path(self.log_dir, f"{self.timestamp}_{file_name}.pkl")
-
         try:
-            with open(file_path, "rb") as f:
+            with open(self._get_path(logger_name), "rb") as f:
                 return pickle.load(f)
         except FileNotFoundError:
             return {}
 
     def _save(self, logger_name, data):
-        file_name = logger_name.replace(".", "_")
-        file_path = Path(self.log_dir, f"{self.timestamp}_{file_name}.pkl")
-
-        with open(file_path, "wb") as f:
+        with open(self._get_path(logger_name), "wb") as f:
             pickle.dump(data, f)
 
+    def _append(self, logger_name, chunk):
+        """Pickles `chunk` at the end of the logger's file. Pickles are self
+        delimiting so the file is just a sequence of chunks.
+        """
+        try:
+            f = self._files[logger_name]
+        except KeyError:
+            path = self._get_path(logger_name)
+            f = self._files[logger_name] = open(path, "ab")  # noqa: SIM115
+        pickle.dump(chunk, f, protocol=pickle.HIGHEST_PROTOCOL)
+        f.flush()
+
     def _add_text(self, record, data):
         if "text" in data:
             data["text"].append(record.msg)
@@ -99,24 +181,430 @@ class PickleHandler(logging.Handler):
                 else:
                     data[k] = entries
 
+    def close(self):
+        self.acquire()
+        try:
+            for f in self._files.values():
+                f.close()
+            self._files.clear()
+        finally:
+            self.release()
+        logging.Handler.close(self)
+
 
-class TensorboardHandler(logging.Handler):
-    """A Handler using the Tensorboard SummaryWriter."""
+def read_pickle(file_path):
+    """Loads a file written by `PickleHandler` in either mode.
 
-    def __init__(self, log_dir):
+    The chunks of an append-only file are concatenated into the same
+    `{metric: [{"step", "value", "time"}], "text": [...]}` layout a rewritten
+    file has. A file written without `append` is simply a file with one chunk.
+    The last chunk, partially written if the run was killed, is ignored.
+    """
+    data = {}
+    with open(file_path, "rb") as f:
+        while True:
+            try:
+                chunk = pickle.load(f)
+            except (EOFError, pickle.UnpicklingError):
+                break
+            for k, v in chunk.items():
+                if k in data:
+                    data[k].extend(v)
+                else:
+                    data[k] = v
+    return data
+
+
+class ColumnarHandler(logging.Handler):
+    """A Handler that stores each traced metric as typed columns.
+
+    Every logger gets a `<timestamp>_<logger>.cols` folder and every metric
+    three raw binary files in it: `.step` (int64), `.value` (float64 or
+    float32) and `.time` (float64), in native byte order. Records are appended
+    at the end of the files so they can be read with `np.fromfile` or
+    `np.memmap`, see `read_columns()`. A `columns.json` index maps the metric
+    names to the files. Dict values, such as the quantiles of a
+    `QuantileMetric`, are stored as one `metric/key` column per scalar field.
+    Text records are not stored. The files are flushed once per record, or
+    once per batch of records with `emit_batch()`.
+    """
+
+    TYPECODES = {"step": "q", "time": "d"}
+    DTYPES = {"q": "int64", "f": "float32", "d": "float64"}
+
+    def __init__(self, log_dir, timestamp=None, dtype="float64"):
         logging.Handler.__init__(self)
         self.log_dir = log_dir
+        if timestamp is None:
+            self.timestamp = int(datetime.timestamp(datetime.now()))
+        else:
+            self.timestamp = int(timestamp)
+        try:
+            self._value_code = {"float32": "f", "float64": "d"}[dtype]
+        except KeyError as err:
+            raise ValueError(f"Unsupported value dtype `{dtype}`.") from err
+        self._columns = {}  # (logger name, metric) -> {column: file}
+        self._index = {}  # logger name -> columns.json content
+        self._dirty = set()  # files written since the last flush
+
+    def emit(self, record):
+        self.emit_batch((record,))
+
+    def emit_batch(self, records):
         try:
-            self.writer = SummaryWriter(log_dir)
-        except NameError as err:
+            for record in records:
+                self._add_record(record)
+        finally:
+            for f in self._dirty:
+                f.flush()
+            self._dirty.clear()
+
+    def _add_record(self, record):
+        if not (isinstance(record.msg, dict) and record.levelname == "TRACE"):
+            return
+
+        try:
+            step = record.msg["step"]
+        except KeyError as err:
             print_fancy_err(
                 err,
-                issue="PyTorch >= 1.1.0 is required for logging to Tensorboard",
-                fix="pip install tensorboard; make sure PyTorch version is correct",
+                issue="ColumnarHandler expects a LogRecord.msg with a `step` field",
+                fix="Make sure your call to rlog.trace() includes the `step` kw",
             )
             raise
 
+        for k, v in record.msg.items():
+            if k in ("step", "extra"):
+                continue
+            if isinstance(v, dict):
+                # a group of named scalars, stored as `metric/name`
+                for k_, v_ in v.items():
+                    if isinstance(v_, numbers.Real):
+                        self._add_column(record, f"{k}/{k_}", (step,), (v_,))
+            elif isinstance(v, list):
+                # same convention as in PickleHandler._add_scalars
+                self._add_column(record, k, range(step - len(v), step), v)
+            elif isinstance(v, numbers.Real):
+                self._add_column(record, k, (step,), (v,))
+
+    def _add_column(self, record, metric, steps, values):
+        files = self._get_columns(record.name, metric)
+        array("q", steps).tofile(files["step"])
+        array(self._value_code, values).tofile(files["value"])
+        array("d", [record.created] * len(steps)).tofile(files["time"])
+        self._dirty.update(files.values())
+
+    def _get_dir(self, logger_name):
+        file_name = logger_name.replace(".", "_")
+        return Path(self.log_dir, f"{self.timestamp}_{file_name}.cols")
+
+    def _get_columns(self, logger_name, metric):
+        try:
+            return self._columns[(logger_name, metric)]
+        except KeyError:
+            pass
+
+        store_dir = self._get_dir(logger_name)
+        store_dir.mkdir(parents=True, exist_ok=True)
+        index = self._index.setdefault(logger_name, {})
+        stem = quote(metric, safe="")
+        index[metric] = {
+            "step": (f"{stem}.step", self.DTYPES["q"]),
+            "value": (f"{stem}.value", self.DTYPES[self._value_code]),
+            "time": (f"{stem}.time", self.DTYPES["d"]),
+        }
+        with open(store_dir / "columns.json", "w") as f:
+            json.dump(index, f)
+
+        files = {
+            column: open(store_dir / file_name, "ab")  # noqa: SIM115
+            for column, (file_name, _) in index[metric].items()
+        }
+        self._columns[(logger_name, metric)] = files
+        return files
+
+    def close(self):
+        self.acquire()
+        try:
+            for files in self._columns.values():
+                for f in files.values():
+                    f.close()
+            self._columns.clear()
+            self._dirty.clear()
+        finally:
+            self.release()
+        logging.Handler.close(self)
+
+
+def read_columns(store_dir, mmap=True):
+    """Loads the folder of a logger written by `ColumnarHandler`.
+
+    Returns `{metric: {"step": ndarray, "value": ndarray, "time": ndarray}}`.
+    With `mmap=True` the arrays are read-only `np.memmap`s of the files.
+    """
+    import numpy as np
+
+    store_dir = Path(store_dir)
+    with open(store_dir / "columns.json") as f:
+        index = json.load(f)
+
+    data = {}
+    for metric, columns in index.items():
+        data[metric] = {}
+        for column, (file_name, dtype) in columns.items():
+            file_path = store_dir / file_name
+            if mmap and file_path.stat().st_size > 0:
+                data[metric][column] = np.memmap(file_path, dtype=dtype, mode="r")
+            else:
+                data[metric][column] = np.fromfile(file_path, dtype=dtype)
+    return data
+
+
+class AsyncHandler(logging.Handler):
+    """A Handler that moves the work of other handlers on a writer thread.
+
+    Records are put on a bounded queue and a thread drains them in batches of
+    at most `batch_size`, passing each record to the wrapped handlers and
+    flushing them once per batch. The queue is drained when the handler is
+    closed or at exit, and `flush()` blocks until it is empty. A forked child
+    starts its own writer thread with the first record it emits.
+
+    When the queue is full the `policy` decides what happens:
+        - "block": wait for the writer to make room.
+        - "drop-oldest": discard the oldest queued record.
+        - "sample": keep only one in `sample_every` of the incoming records,
+          waiting for room for the ones that are kept.
+    Dropped records are counted in `dropped`.
+    """
+
+    POLICIES = ("block", "drop-oldest", "sample")
+
+    @property
+    def handles_schemas(self):
+        return any(getattr(h, "handles_schemas", False) for h in self.handlers)
+
+    def __init__(
+        self, *handlers, maxsize=10_000, batch_size=256, policy="block", sample_every=2
+    ):
+        logging.Handler.__init__(self)
+        if policy not in self.POLICIES:
+            raise ValueError(f"Policy should be one of {self.POLICIES}, not {policy}.")
+        self.handlers = list(handlers)
+        self.batch_size = batch_size
+        self.policy = policy
+        self.sample_every = sample_every
+        self.dropped = 0
+        self._overflow = 0  # records that found the queue full
+        self._queue = queue.Queue(maxsize)
+        self._thread = None
+        self._start()
+        atexit.register(self.close)
+        _FORK_RESET.add(self)
+
+    def _start(self):
+        self._thread = threading.Thread(
+            target=self._drain, name="rlog-writer", daemon=True
+        )
+        self._thread.start()
+        # Multiprocessing children exit without running atexit, and drop the
+        # finalizers registered before they start, which a forked child's
+        # writer thread, started by its first emit, is not.
+        util.Finalize(self, self.flush, exitpriority=10)
+
+    def _after_fork(self):
+        # The writer thread is not copied in the child, and the queued records
+        # are the parent's to write.
+        self._queue = queue.Queue(self._queue.maxsize)
+        self._thread = None
+
+    def prepare(self, record):
+        """Merges the message arguments, like `logging.handlers.QueueHandler`
+        does, so that the record no longer depends on the caller's objects.
+        """
+        if not isinstance(record.msg, dict):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+
+    def emit(self, record):
+        if self._thread is None:
+            self._start()
+        record = self.prepare(record)
+        try:
+            self._queue.put_nowait(record)
+            return
+        except queue.Full:
+            self._overflow += 1
+
+        if self.policy == "block":
+            self._queue.put(record)
+        elif self.policy == "drop-oldest":
+            while True:
+                try:
+                    self._queue.get_nowait()
+                    self._queue.task_done()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+                try:
+                    self._queue.put_nowait(record)
+                    break
+                except queue.Full:
+                    continue
+        elif self._overflow % self.sample_every == 0:
+            self._queue.put(record)
+        else:
+            self.dropped += 1
+
+    def _drain(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                pass
+
+            done = self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+            if done:
+                return
+
+    def _write(self, batch):
+        done = any(record is None for record in batch)
+        records = [record for record in batch if record is not None]
+        for handler in self.handlers:
+            handle_batch(handler, records)
+            handler.flush()
+        return done
+
+    def flush(self):
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.join()
+
+    def close(self):
+        atexit.unregister(self.close)
+        _FORK_RESET.discard(self)
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        for handler in self.handlers:
+            handler.close()
+        logging.Handler.close(self)
+
+
+class BufferedFileHandler(logging.FileHandler):
+    """A FileHandler that keeps the formatted records in memory and writes
+    them in one go, instead of flushing the file after every record.
+
+    The buffer is written when it holds more than `capacity` characters, at
+    most `flush_secs` after its first record, for records of `flush_level` and
+    above, which are thus never delayed, and on `flush()` and `close()`. At
+    exit, including after an uncaught exception and in multiprocessing
+    children, the buffer is written too. The file is created with the first
+    write.
+    """
+
+    def __init__(
+        self,
+        filename,
+        mode="a",
+        encoding=None,
+        capacity=1 << 16,
+        flush_secs=5.0,
+        flush_level=logging.WARNING,
+    ):
+        logging.FileHandler.__init__(self, filename, mode, encoding, delay=True)
+        self.capacity = capacity
+        self.flush_secs = flush_secs
+        self.flush_level = flush_level
+        self._lines, self._size = [], 0
+        self._timer = None
+        self._finalizer = None
+        _FORK_RESET.add(self)
+
     def emit(self, record):
+        try:
+            line = self.format(record) + self.terminator
+            self._lines.append(line)
+            self._size += len(line)
+            if record.levelno >= self.flush_level or self._size >= self.capacity:
+                self.flush()
+            elif self._timer is None:
+                self._timer = threading.Timer(self.flush_secs, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+            if self._finalizer is None:
+                # Multiprocessing children exit without running atexit, and
+                # drop the finalizers registered before they start.
+                self._finalizer = util.Finalize(self, self.flush, exitpriority=10)
+        except Exception:
+            self.handleError(record)
+
+    def _after_fork(self):
+        # The buffered lines are the parent's to write.
+        self._lines, self._size = [], 0
+        self._timer = self._finalizer = None
+
+    def flush(self):
+        self.acquire()
+        try:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._lines:
+                if self.stream is None:
+                    self.stream = self._open()
+                self.stream.write("".join(self._lines))
+                self._lines, self._size = [], 0
+            if self.stream is not None:
+                self.stream.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        self.flush()
+        _FORK_RESET.discard(self)
+        logging.FileHandler.close(self)
+
+
+class TensorboardHandler(logging.Handler):
+    """A Handler writing Tensorboard event files with `EventFileWriter`.
+
+    Events are buffered by the writer and written in batches, see its
+    `flush_secs` and `max_buffer` arguments. The writer, and its event file,
+    are created with the first record.
+
+    Metrics are written as scalars unless the schema of their logger, sent
+    once by the RLogger, gives another `tb_type`. Schemas are kept per process,
+    since forwarding workers can use the logger names of the parent.
+    """
+
+    handles_schemas = True
+
+    def __init__(self, log_dir, flush_secs=10, max_buffer=1 << 20):
+        logging.Handler.__init__(self)
+        self.log_dir = log_dir
+        self.flush_secs = flush_secs
+        self.max_buffer = max_buffer
+        self.writer = None
+        self._tb_types = {}  # (logger name, process) -> {metric: tb_type}
+
+    def emit(self, record):
+        schema = getattr(record, "rlog_schema", None)
+        if schema is not None:
+            self._tb_types[record.name, record.process] = {
+                metric: fields["tb_type"]
+                for metric, fields in schema["metrics"].items()
+            }
+            return
+        if self.writer is None:
+            from .tensorboard import EventFileWriter
+
+            self.writer = EventFileWriter(
+                self.log_dir, flush_secs=self.flush_secs, max_buffer=self.max_buffer
+            )
         if isinstance(record.msg, dict) and record.levelname == "TRACE":
             self._add_key_value_items(record)
         else:
@@ -141,35 +629,51 @@ class TensorboardHandler(logging.Handler):
             )
             raise
 
-        tb_types = {k: "scalar" for k, v in record.msg.items() if k != "extra"}
-        if "extra" in record.msg:
-            for metric_name, tb_type in record.msg["extra"]["tb_types"].items():
-                tb_types[metric_name] = tb_type
-
+        tb_types = self._tb_types.get((record.name, record.process), {})
         for metric, value in record.msg.items():
             if metric not in ("step", "extra"):
                 tag = f"{rec_name}/{metric}"
+                tb_type = tb_types.get(metric, "scalar")
 
-                if tb_types[metric] == "scalar":
+                if tb_type == "scalar":
                     self._add_scalars(tag, step, value)
-                elif tb_types[metric] == "histogram":
+                elif tb_type == "histogram":
                     self._add_histogram(tag, step, value)
                 else:
                     raise ValueError("There should be a Tensorboard type.")
 
     def _add_scalars(self, tag, step, value):
-        if isinstance(value, list):
-            step = step - len(value)
-            for i, v_ in enumerate(value):
-                self.writer.add_scalar(tag, v_, global_step=step + i)
+        if isinstance(value, dict):
+            # a group of named scalars, such as the quantiles of a QuantileMetric
+            for k, v in value.items():
+                self._add_scalars(f"{tag}/{k}", step, v)
+        elif isinstance(value, list):
+            self.writer.add_scalar_series(tag, value, step - len(value))
         else:
             self.writer.add_scalar(tag, value, global_step=step)
 
     def _add_histogram(self, tag, step, values):
         if isinstance(values, list):
             self.writer.add_histogram(tag, values, global_step=step)
+        elif isinstance(values, dict):
+            # an already bucketed histogram, such as a QuantileMetric reports
+            self.writer.add_histogram_raw(tag, global_step=step, **values)
         else:
             raise ValueError("There should be a list of values...")
 
+    def flush(self):
+        self.acquire()
+        try:
+            if self.writer is not None:
+                self.writer.flush()
+        finally:
+            self.release()
+
     def close(self):
-        self.writer.close()
+        self.acquire()
+        try:
+            if self.writer is not None:
+                self.writer.close()
+        finally:
+            self.release()
+        logging.Handler.close(self)
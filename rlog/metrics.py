@@ -1,20 +1,68 @@
+import bisect
 import math
-import re
+import random
+import sys
 import time
+from array import array
+from collections import deque
+from itertools import compress
+from operator import itemgetter
+
+from .expressions import clip, compile_metarg
 
 __all__ = [
     "Accumulator",
+    "ArrayAccumulator",
     "AvgMetric",
     "BaseMetric",
     "EpisodicMetric",
     "EWMAvgMetric",
     "FPSMetric",
     "MaxMetric",
+    "QuantileMetric",
     "SumMetric",
+    "TDigest",
+    "TimerMetric",
     "ValueMetric",
+    "WindowAvgMetric",
+    "WindowEpisodicMetric",
 ]
 
 
+# Tensors traced with `put` are accumulated as they are, on their device and
+# with the library's own arithmetic. They are copied to the host as Python
+# numbers only when the metrics are reported, so that tracing a value does not
+# wait for the computation producing it.
+_SCALARS = frozenset((int, float, bool))
+_LIBRARIES = {"torch": "torch", "jax": "jax.numpy", "jaxlib": "jax.numpy"}
+
+
+def _detach(val):
+    """Drops the autograd graph of a tensor, keeping it on its device."""
+    detach = getattr(val, "detach", None)
+    return val if detach is None else detach()
+
+
+def _item(val):
+    """Converts a tensor or a NumPy scalar to a Python number."""
+    if type(val) in _SCALARS:
+        return val
+    item = getattr(val, "item", None)
+    return val if item is None else item()
+
+
+def _maximum(a, b):
+    """The maximum of `a` and `b`, computed by the library of the tensor."""
+    if type(a) in _SCALARS and a == -math.inf:
+        return b
+    tensor = a if type(b) in _SCALARS else b
+    module = type(tensor).__module__.partition(".")[0]
+    lib = sys.modules.get(_LIBRARIES.get(module, ""))
+    if lib is None:
+        return max(a, b)
+    return lib.maximum(lib.asarray(a), lib.asarray(b))
+
+
 """TODO: needs refactoring, class hierarchy makes no sense:
     - why reset does not reset _val in BaseMetric?
 """
@@ -34,15 +82,34 @@ class BaseMetric:
 
     @property
     def value(self):
-        return self._val
+        return _item(self._val)
 
     def accumulate(self, val, *args):
         raise NotImplementedError
 
+    def accumulate_batch(self, *args):
+        """Accumulates arrays holding a value per environment, with the same
+        result as calling `accumulate` for each of their elements in order.
+        Subclasses do it with NumPy reductions instead of this loop.
+        """
+        for row in zip(*(arg.tolist() for arg in args), strict=True):
+            self.accumulate(*row)
+
     def reset(self):
         if self._resetable:
             self._updated = False
 
+    def state(self):
+        """Returns a compact, picklable state of what the metric accumulated
+        since the last reset, that can be combined into the same metric of
+        another process with `merge()`.
+        """
+        return _item(self._val), self._updated
+
+    def merge(self, state):
+        """Combines the `state()` of the same metric from another process."""
+        raise NotImplementedError
+
     @property
     def name(self):
         return self._name
@@ -68,21 +135,109 @@ class BaseMetric:
 
 
 class ValueMetric(BaseMetric):
+    """Keeps the values it receives and reports them as a list.
+
+    By default all the values since the last reset are kept, tensors being
+    converted to numbers when reported. With a `capacity` the values are
+    stored in a preallocated float array instead, so the memory used is fixed
+    and `accumulate` does not allocate:
+        - mode="ring" keeps the last `capacity` values.
+        - mode="reservoir" keeps a uniform sample of `capacity` values.
+    """
+
+    MODES = ("ring", "reservoir")
+
     def __init__(
-        self, name, resetable=True, emph=False, metargs=None, tb_type="scalar"
+        self,
+        name,
+        resetable=True,
+        emph=False,
+        metargs=None,
+        tb_type="scalar",
+        capacity=None,
+        mode="ring",
     ):
         BaseMetric.__init__(self, name, resetable, emph, metargs=metargs)
         self._val = []
         self._tb_type = tb_type
+        if mode not in self.MODES:
+            raise ValueError(f"Mode should be one of {self.MODES}, not {mode}.")
+        self._capacity = capacity
+        self._reservoir = mode == "reservoir"
+        self._buf = None if capacity is None else array("d", bytes(8 * capacity))
+        self._head = 0  # next slot of the ring buffer
+        self._count = 0  # values seen since the last reset
+
+    @property
+    def value(self):
+        if self._buf is None:
+            return [_item(v) for v in self._val]
+        if self._count <= self._capacity:
+            return self._buf[: self._count].tolist()
+        if self._reservoir:
+            return self._buf.tolist()
+        # oldest values first
+        return self._buf[self._head :].tolist() + self._buf[: self._head].tolist()
+
+    @property
+    def capacity(self):
+        return self._capacity
 
     def accumulate(self, val):
-        self._val.append(val)
+        if self._buf is None:
+            self._val.append(val if type(val) in _SCALARS else _detach(val))
+        elif self._reservoir:
+            self._sample(val)
+        else:
+            self._push(val)
         self._updated = True
 
+    def _push(self, val):
+        head = self._head
+        self._buf[head] = val
+        head += 1
+        self._head = 0 if head == self._capacity else head
+        self._count += 1
+
+    def _sample(self, val):
+        # Algorithm R
+        count = self._count
+        if count < self._capacity:
+            self._buf[count] = val
+        else:
+            idx = int(random.random() * (count + 1))
+            if idx < self._capacity:
+                self._buf[idx] = val
+        self._count = count + 1
+
+    def state(self):
+        return self.value, self._updated
+
+    def merge(self, state):
+        values, updated = state
+        if self._buf is None:
+            self._val.extend(values)
+        else:
+            for val in values:
+                self.accumulate(val)
+        self._updated |= updated
+
+    def accumulate_batch(self, val):
+        if not len(val):
+            return
+        if self._buf is None:
+            self._val.extend(val.tolist())
+            self._updated = True
+        else:
+            for val_ in val.tolist():
+                self.accumulate(val_)
+
     def reset(self):
         super().reset()
         if self._resetable:
             self._val = []
+            self._head = 0
+            self._count = 0
 
 
 class MaxMetric(BaseMetric):
@@ -91,9 +246,22 @@ class MaxMetric(BaseMetric):
         self._val = -math.inf
 
     def accumulate(self, val):
-        self._val = max(self._val, val)
+        if type(val) in _SCALARS and type(self._val) in _SCALARS:
+            self._val = max(self._val, val)
+        else:
+            self._val = _maximum(self._val, _detach(val))
         self._updated = True
 
+    def accumulate_batch(self, val):
+        if len(val):
+            self._val = max(self._val, val.max().item())
+            self._updated = True
+
+    def merge(self, state):
+        val, updated = state
+        self._val = max(_item(self._val), val)
+        self._updated |= updated
+
     def reset(self):
         super().reset()
         if self._resetable:
@@ -105,9 +273,19 @@ class SumMetric(BaseMetric):
         BaseMetric.__init__(self, name, resetable, emph, metargs=metargs)
 
     def accumulate(self, val):
-        self._val += val
+        self._val += val if type(val) in _SCALARS else _detach(val)
         self._updated = True
 
+    def accumulate_batch(self, val):
+        if len(val):
+            self._val = _seqsum(self._val, val)
+            self._updated = True
+
+    def merge(self, state):
+        val, updated = state
+        self._val += val
+        self._updated |= updated
+
     def reset(self):
         super().reset()
         if self._resetable:
@@ -122,14 +300,29 @@ class AvgMetric(BaseMetric):
     @property
     def value(self):
         if self._counter == 0:
-            return self._val
-        return self._val / self._counter
+            return _item(self._val)
+        return _item(self._val / self._counter)
 
     def accumulate(self, val, n):
-        self._val += val
+        self._val += val if type(val) in _SCALARS else _detach(val)
         self._counter += n
         self._updated = True
 
+    def accumulate_batch(self, val, n):
+        if len(val):
+            self._val = _seqsum(self._val, val)
+            self._counter = _seqsum(self._counter, n)
+            self._updated = True
+
+    def state(self):
+        return _item(self._val), _item(self._counter), self._updated
+
+    def merge(self, state):
+        val, counter, updated = state
+        self._val += val
+        self._counter += counter
+        self._updated |= updated
+
     def reset(self):
         super().reset()
         if self._resetable:
@@ -165,24 +358,50 @@ class EWMAvgMetric(BaseMetric):
         self._avg.accumulate(val, n)
         self._updated = True
 
+    def accumulate_batch(self, val, n=None):
+        if len(val):
+            self._avg.accumulate_batch(val, [1] * len(val) if n is None else n)
+            self._updated = True
+
+    def state(self):
+        # Only the average accumulated since the last summary is shipped. The
+        # merged averages of all the workers then enter the smoothing once,
+        # as a single new observation of the receiving metric.
+        return self._avg.state()
+
+    def merge(self, state):
+        self._avg.merge(state)
+        self._updated |= self._avg.updated
+
     def reset(self):
         super().reset()
         self._avg.reset()
 
 
 class EpisodicMetric(BaseMetric):
+    """Averages the values summed over each episode.
+
+    With `accumulate_batch` the partial returns are kept for each environment
+    index, so the episodes of vectorized environments do not mix. Values can
+    be tensors but the episode ends, `n`, are tested on every step and should
+    be Python numbers.
+    """
+
     def __init__(self, name, resetable=True, emph=False, metargs=None):
         BaseMetric.__init__(self, name, resetable, emph, metargs=metargs)
         self.counter = 0
         self.partial_val = 0
+        self.partial_vals = None  # per environment, used by accumulate_batch
 
     @property
     def value(self):
         if self.counter == 0:
-            return self._val
-        return self._val / self.counter
+            return _item(self._val)
+        return _item(self._val / self.counter)
 
     def accumulate(self, val, n=1):
+        if type(val) not in _SCALARS:
+            val = _detach(val)
         if n == 0:
             self.partial_val += val
         else:
@@ -191,12 +410,40 @@ class EpisodicMetric(BaseMetric):
             self.partial_val = 0
         self._updated = True
 
+    def accumulate_batch(self, val, n=None):
+        import numpy as np
+
+        if not len(val):
+            return
+        if self.partial_vals is None or len(self.partial_vals) != len(val):
+            self.partial_vals = np.zeros(len(val))
+        if n is None:
+            n = np.ones(len(val), dtype=np.int64)
+
+        totals = self.partial_vals + val
+        ended = n != 0
+        self._val = _seqsum(self._val, totals[ended])
+        self.counter = _seqsum(self.counter, n[ended])
+        self.partial_vals = np.where(ended, 0.0, totals)
+        self._updated = True
+
+    def state(self):
+        # episodes still running stay with the process that runs them
+        return _item(self._val), _item(self.counter), self._updated
+
+    def merge(self, state):
+        val, counter, updated = state
+        self._val += val
+        self.counter += counter
+        self._updated |= updated
+
     def reset(self):
         super().reset()
         if self._resetable:
             self._val = 0
             self.counter = 0
             self.partial_val = 0
+            self.partial_vals = None
 
 
 class FPSMetric(BaseMetric):
@@ -206,12 +453,28 @@ class FPSMetric(BaseMetric):
 
     @property
     def value(self):
-        return self._val / (time.time() - self._start)
+        return _item(self._val) / (time.time() - self._start)
 
     def accumulate(self, val, *args):
-        self._val += val
+        self._val += val if type(val) in _SCALARS else _detach(val)
         self._updated = True
 
+    def accumulate_batch(self, val, *args):
+        if len(val):
+            self._val = _seqsum(self._val, val)
+            self._updated = True
+
+    def state(self):
+        return _item(self._val), self._start, self._updated
+
+    def merge(self, state):
+        # The frames add up over the window spanning all the processes, which
+        # gives the throughput of the processes running side by side.
+        val, start, updated = state
+        self._val += val
+        self._start = min(self._start, start) if self._updated else start
+        self._updated |= updated
+
     def reset(self):
         super().reset()
         if self._resetable:
@@ -219,33 +482,537 @@ class FPSMetric(BaseMetric):
             self._start = time.time()
 
 
-def clip(x):
-    return max(min(1, x), -1)
+class _Window:
+    """The last `size` values, with their sum, maximum and minimum kept up to
+    date in O(1) per value: a ring buffer, a running sum and monotonic deques
+    of the positions of the candidates for the maximum and the minimum.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self._buf = array("d", bytes(8 * size))
+        self.clear()
+
+    def clear(self):
+        self._count = 0  # values pushed, the i-th one is at (i - 1) % size
+        self._sum = 0.0
+        self._max, self._min = deque(), deque()
+
+    def __len__(self):
+        return min(self._count, self.size)
+
+    def push(self, val):
+        buf, size = self._buf, self.size
+        val = float(val)
+        head = self._count % size
+        if self._count >= size:
+            self._sum -= buf[head]
+        buf[head] = val
+        self._sum += val
+        if head == size - 1:
+            # the window is full, drop the rounding errors of the running sum
+            self._sum = math.fsum(buf)
+        self._count = count = self._count + 1
+
+        # drop the candidate leaving the window, then the ones `val` beats
+        stale = count - size
+        hi, lo = self._max, self._min
+        if hi and hi[0] <= stale:
+            hi.popleft()
+        while hi and buf[(hi[-1] - 1) % size] <= val:
+            hi.pop()
+        hi.append(count)
+        if lo and lo[0] <= stale:
+            lo.popleft()
+        while lo and buf[(lo[-1] - 1) % size] >= val:
+            lo.pop()
+        lo.append(count)
+
+    def values(self):
+        """The values in the window, oldest first."""
+        if self._count <= self.size:
+            return self._buf[: self._count].tolist()
+        head = self._count % self.size
+        return self._buf[head:].tolist() + self._buf[:head].tolist()
+
+    def summary(self):
+        buf, size = self._buf, self.size
+        return {
+            "mean": self._sum / len(self),
+            "max": buf[(self._max[0] - 1) % size],
+            "min": buf[(self._min[0] - 1) % size],
+        }
+
+
+class WindowAvgMetric(BaseMetric):
+    """Reports the `mean`, `max` and `min` of the last `window` values.
+
+    Unlike `AvgMetric` the window does not depend on how often the metrics are
+    summarized and reset, so the metric is not resetable by default.
+    """
+
+    def __init__(self, name, window=100, resetable=False, emph=False, metargs=None):
+        BaseMetric.__init__(self, name, resetable, emph, metargs=metargs)
+        self._val = _Window(window)
+
+    @property
+    def value(self):
+        return self._val.summary()
+
+    @property
+    def window(self):
+        return self._val.size
+
+    def accumulate(self, val):
+        self._val.push(val)
+        self._updated = True
+
+    def state(self):
+        return self._val.values(), self._updated
+
+    def merge(self, state):
+        # the order of the values of different processes is unknown, the
+        # incoming ones are taken as the most recent
+        values, updated = state
+        for val in values:
+            self._val.push(val)
+        self._updated |= updated
+
+    def reset(self):
+        super().reset()
+        if self._resetable:
+            self._val.clear()
+
+
+class WindowEpisodicMetric(WindowAvgMetric):
+    """Reports the `mean`, `max` and `min` of the values summed over each of
+    the last `window` episodes, such as the return over the last 100 episodes.
+
+    The sums of the episodes still running are kept like in `EpisodicMetric`,
+    per environment with `accumulate_batch`.
+    """
+
+    def __init__(self, name, window=100, resetable=False, emph=False, metargs=None):
+        WindowAvgMetric.__init__(self, name, window, resetable, emph, metargs)
+        self.partial_val = 0
+        self.partial_vals = None
+
+    def accumulate(self, val, n=1):
+        if type(val) not in _SCALARS:
+            val = _detach(val)
+        if n == 0:
+            self.partial_val += val
+        else:
+            self._val.push(self.partial_val + val)
+            self.partial_val = 0
+            self._updated = True
+
+    def accumulate_batch(self, val, n=None):
+        import numpy as np
+
+        if not len(val):
+            return
+        if self.partial_vals is None or len(self.partial_vals) != len(val):
+            self.partial_vals = np.zeros(len(val))
+        if n is None:
+            n = np.ones(len(val), dtype=np.int64)
+
+        totals = self.partial_vals + val
+        ended = n != 0
+        for total in totals[ended].tolist():
+            self._val.push(total)
+        self.partial_vals = np.where(ended, 0.0, totals)
+        self._updated |= bool(ended.any())
+
+    def reset(self):
+        super().reset()
+        if self._resetable:
+            self.partial_val = 0
+            self.partial_vals = None
+
+
+class TimerMetric(BaseMetric):
+    """Accumulates durations in nanoseconds, such as the ones measured by
+    `RLogger.span()`, and reports their `mean`, `max` and `total` in
+    milliseconds, along with their `count`.
+    """
+
+    def __init__(self, name, resetable=True, emph=False, metargs=None):
+        BaseMetric.__init__(self, name, resetable, emph, metargs=metargs)
+        self._count = 0
+        self._max = 0
+
+    @property
+    def value(self):
+        return {
+            "mean": self._val / self._count / 1e6 if self._count else 0.0,
+            "max": self._max / 1e6,
+            "total": self._val / 1e6,
+            "count": self._count,
+        }
+
+    def accumulate(self, val):
+        self._val += val
+        self._count += 1
+        if val > self._max:
+            self._max = val
+        self._updated = True
+
+    def accumulate_batch(self, val):
+        if len(val):
+            self._val = _seqsum(self._val, val)
+            self._count += len(val)
+            self._max = max(self._max, val.max().item())
+            self._updated = True
+
+    def state(self):
+        return self._val, self._count, self._max, self._updated
+
+    def merge(self, state):
+        val, count, max_, updated = state
+        self._val += val
+        self._count += count
+        self._max = max(self._max, max_)
+        self._updated |= updated
+
+    def reset(self):
+        super().reset()
+        if self._resetable:
+            self._val, self._count, self._max = 0, 0, 0
+
+
+class TDigest:
+    """A merging t-digest, a constant size sketch of a distribution.
+
+    Values are buffered and periodically merged into at most about
+    `compression` centroids, that are small around the tails and large around
+    the median. Quantiles and the CDF are interpolated between the centroids.
+    See Dunning & Ertl, "Computing Extremely Accurate Quantiles Using
+    t-Digests".
+    """
+
+    def __init__(self, compression=100):
+        self.compression = compression
+        self.clear()
+
+    def clear(self):
+        self.means, self.weights = [], []
+        self.count, self.sum, self.sum_squares = 0, 0.0, 0.0
+        self.min, self.max = math.inf, -math.inf
+        self._buffer = []
+        self._buffer_size = 5 * self.compression
+        self._knots = None
+
+    def add(self, val):
+        self._buffer.append(val)
+        if len(self._buffer) >= self._buffer_size:
+            self._merge()
+
+    def extend(self, vals):
+        for val in vals:
+            self.add(val)
+
+    def state(self):
+        self._merge()
+        return (
+            self.means,
+            self.weights,
+            self.count,
+            self.sum,
+            self.sum_squares,
+            self.min,
+            self.max,
+        )
+
+    def merge(self, state):
+        """Merges the `state()` of another digest into this one."""
+        means, weights, count, sum_, sum_squares, min_, max_ = state
+        if not count:
+            return
+        self._merge(means, weights)
+        self.count += count
+        self.sum += sum_
+        self.sum_squares += sum_squares
+        self.min = min(self.min, min_)
+        self.max = max(self.max, max_)
+
+    def _merge(self, means=(), weights=()):
+        """Merges the buffered values, and optionally the centroids of another
+        digest, into the centroids.
+        """
+        buffer, self._buffer = self._buffer, []
+        if not buffer and not means:
+            return
+        if buffer:
+            self.count += len(buffer)
+            self.sum += math.fsum(buffer)
+            self.sum_squares += math.fsum(x * x for x in buffer)
+            self.min = min(self.min, min(buffer))
+            self.max = max(self.max, max(buffer))
+        total = sum(self.weights) + sum(weights) + len(buffer)
+        # sorted() merges the sorted runs in linear time
+        buffer.sort()
+        points = sorted(
+            [
+                *zip(self.means, self.weights, strict=True),
+                *zip(means, weights, strict=True),
+                *zip(buffer, [1] * len(buffer), strict=True),
+            ]
+        )
+
+        scale = self.compression / (2 * math.pi)  # of the k1 scale function
+        self.means, self.weights = [], []
+        cum = 0
+        limit = total * self._q_limit(0, scale)
+        mean, weight = points[0]
+        for mean_, weight_ in points[1:]:
+            if cum + weight + weight_ <= limit:
+                weight += weight_
+                mean += (mean_ - mean) * weight_ / weight
+            else:
+                self.means.append(mean)
+                self.weights.append(weight)
+                cum += weight
+                limit = total * self._q_limit(cum / total, scale)
+                mean, weight = mean_, weight_
+        self.means.append(mean)
+        self.weights.append(weight)
+        self._knots = None
+
+    @staticmethod
+    def _q_limit(q, scale):
+        """The largest quantile a centroid starting at `q` can reach, so that
+        it spans at most one unit of the scale function `k(q) = scale *
+        asin(2q - 1)`.
+        """
+        k = min(scale * math.asin(2 * min(q, 1) - 1) + 1, scale * math.pi / 2)
+        return (math.sin(k / scale) + 1) / 2
+
+    def _get_knots(self):
+        """Values and cumulative weights of the piecewise linear CDF going
+        through the extremes and the centers of the centroids.
+        """
+        if self._buffer:
+            self._merge()
+        if self._knots is None:
+            xs, ys, cum = [self.min], [0.0], 0
+            for mean, weight in zip(self.means, self.weights, strict=True):
+                xs.append(mean)
+                ys.append(cum + weight / 2)
+                cum += weight
+            xs.append(self.max)
+            ys.append(float(cum))
+            self._knots = xs, ys
+        return self._knots
+
+    def quantile(self, q):
+        if not self.count and not self._buffer:
+            return math.nan
+        xs, ys = self._get_knots()
+        return _interpolate(q * ys[-1], ys, xs)
+
+    def cdf(self, x):
+        if not self.count and not self._buffer:
+            return math.nan
+        xs, ys = self._get_knots()
+        return _interpolate(x, xs, ys) / ys[-1]
+
+    def histogram(self, bins=30):
+        """Returns the right edges of `bins` equal buckets between the min and
+        the max and the approximate number of values in each.
+        """
+        xs, ys = self._get_knots()
+        width = (self.max - self.min) / bins
+        limits = [self.min + width * (i + 1) for i in range(bins)]
+        limits[-1] = self.max
+        cums = [_interpolate(x, xs, ys) for x in limits]
+        counts = [hi - lo for lo, hi in zip([0.0, *cums[:-1]], cums, strict=True)]
+        return limits, counts
+
+
+def _interpolate(x, xs, ys):
+    """Linear interpolation of `x` in the increasing knots `xs`."""
+    if x <= xs[0]:
+        return ys[0]
+    if x >= xs[-1]:
+        return ys[-1]
+    i = bisect.bisect_right(xs, x)
+    x0, x1, y0, y1 = xs[i - 1], xs[i], ys[i - 1], ys[i]
+    if x1 == x0:
+        return y1
+    return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+
+
+class QuantileMetric(BaseMetric):
+    """Keeps a `TDigest` of the values it receives, in constant memory.
+
+    With the default `tb_type="scalar"` it reports a dict of the chosen
+    `quantiles`, keyed as `p50`, `p99`, etc. With `tb_type="histogram"` it
+    reports a histogram of `bins` buckets instead, as a dict with the fields
+    of a TensorBoard histogram: `min`, `max`, `num`, `sum`, `sum_squares`,
+    `bucket_limits` and `bucket_counts`.
+    """
+
+    def __init__(
+        self,
+        name,
+        resetable=True,
+        emph=False,
+        metargs=None,
+        tb_type="scalar",
+        quantiles=(0.5, 0.9, 0.99),
+        compression=100,
+        bins=30,
+    ):
+        BaseMetric.__init__(self, name, resetable, emph, metargs=metargs)
+        self._tb_type = tb_type
+        self._quantiles = {f"p{q * 100:g}": q for q in quantiles}
+        self._bins = bins
+        self._val = TDigest(compression)
+
+    @property
+    def value(self):
+        digest = self._val
+        if self._tb_type == "histogram":
+            limits, counts = digest.histogram(self._bins)
+            return {
+                "min": digest.min,
+                "max": digest.max,
+                "num": digest.count,
+                "sum": digest.sum,
+                "sum_squares": digest.sum_squares,
+                "bucket_limits": limits,
+                "bucket_counts": counts,
+            }
+        return {k: digest.quantile(q) for k, q in self._quantiles.items()}
+
+    def accumulate(self, val):
+        self._val.add(val)
+        self._updated = True
+
+    def accumulate_batch(self, val):
+        if len(val):
+            self._val.extend(val.tolist())
+            self._updated = True
 
+    def state(self):
+        return self._val.state(), self._updated
 
-FNS = {"clip": clip, "int": int}
+    def merge(self, state):
+        digest, updated = state
+        self._val.merge(digest)
+        self._updated |= updated
+
+    def reset(self):
+        super().reset()
+        if self._resetable:
+            self._val.clear()
+
+
+def _seqsum(start, values):
+    """Adds `values` to `start` from left to right like repeated `+=` does, so
+    that the result is exactly the one of the scalar path, as a Python number.
+    """
+    import numpy as np
+
+    values = np.concatenate((np.asarray([start]), np.asarray(values)))
+    return np.cumsum(values)[-1].item()
+
+
+def _compile_metargs(metargs):
+    """Compiles all the metargs of a metric into a single function returning
+    the arguments of `metric.accumulate`. Returns the function, wether its
+    result is a tuple to be unpacked or a single argument and the keys read.
+    """
+    getters, keys = [], []
+    for metarg in metargs:
+        getter, keys_ = compile_metarg(metarg)
+        getters.append(getter)
+        keys.extend(k for k in keys_ if k not in keys)
+
+    if len(getters) == 1:
+        return getters[0], False, keys
+    if all(isinstance(g, itemgetter) for g in getters):
+        # a single C call, returning a tuple
+        return itemgetter(*metargs), True, keys
+
+    def get(kwargs):
+        return [g(kwargs) for g in getters]
+
+    return get, True, keys
 
 
 class Accumulator:
+    """Dispatches the values received by `trace()` to its metrics.
+
+    The metargs are compiled once, when metrics are added, into an index of
+    the metrics reading each key. Every distinct set of keys `trace()` gets
+    called with is then resolved to a plan, the list of metrics to update
+    with their argument getters, that is cached until metrics change.
+
+    `trace_batch()` does the same for arrays holding one value per
+    environment, updating the metrics with NumPy reductions.
+    """
+
     def __init__(self, *metrics, console_options=None):
         self.metrics = {}
+        self.schema_version = 0
         self.add_metrics(*metrics)
         self.console_options = console_options
 
     def add_metrics(self, *metrics):
         """Add metrics to the Accumulator."""
         self.metrics.update({m.name: m for m in metrics})
+        self._compile()
+
+    def _compile(self):
+        self._index = {}  # key -> names of the metrics reading it
+        self._getters = {}  # metric name -> (getter, unpack)
+        for metric in self.metrics.values():
+            if not metric.metargs:
+                continue  # only accumulated directly, like by spans
+            getter, unpack, keys = _compile_metargs(metric.metargs)
+            self._getters[metric.name] = getter, unpack
+            for key in keys:
+                self._index.setdefault(key, []).append(metric.name)
+        self._plans = {}  # tuple of keys -> (unary, n-ary) updates
+        self._batch_plans = {}  # tuple of keys -> batched updates
+        self.schema_version += 1
+
+    def schema(self):
+        """Describes the metrics to the handlers, which get it once for every
+        `schema_version` instead of with each summary.
+        """
+        return {
+            m.name: {"tb_type": m.tb_type, "type": type(m).__name__}
+            for m in self.metrics.values()
+        }
+
+    def _plan(self, keys):
+        names = {name for key in keys for name in self._index.get(key, ())}
+        unary, nary = [], []
+        for name, metric in self.metrics.items():
+            if name in names:
+                getter, unpack = self._getters[name]
+                (nary if unpack else unary).append((metric.accumulate, getter))
+        return unary, nary
+
+    def _batch_plan(self, keys):
+        names = {name for key in keys for name in self._index.get(key, ())}
+        plan = []
+        for name, metric in self.metrics.items():
+            if name in names:
+                getters = [
+                    compile_metarg(m, vectorized=True)[0] for m in metric.metargs
+                ]
+                plan.append((metric.accumulate_batch, getters))
+        return plan
 
     def summarize(self):
         # check wether the metric has been updated between two resets.
         updated_metrics = [m for m in self.metrics.values() if m.updated]
         # and get the return values of each metric
-        payload = {m.name: m.value for m in updated_metrics}
-        # add the tensorboard types
-        payload["extra"] = {
-            "tb_types": {m.name: m.tb_type for m in self.metrics.values()}
-        }
-        return payload
+        return {m.name: m.value for m in updated_metrics}
 
     def accumulate(self, **kwargs):
         for k, v in kwargs.items():
@@ -258,44 +1025,260 @@ class Accumulator:
                 self.metrics[k].accumulate(v)
 
     def trace(self, **kwargs):
-        for metric in self._updatable_metrics(kwargs):
-            args = self._process(metric.metargs, kwargs)
-            metric.accumulate(*args)
+        keys = tuple(kwargs)
+        try:
+            unary, nary = self._plans[keys]
+        except KeyError:
+            unary, nary = self._plans[keys] = self._plan(keys)
+        for accumulate, get in unary:
+            accumulate(get(kwargs))
+        for accumulate, get in nary:
+            accumulate(*get(kwargs))
+
+    def trace_batch(self, **kwargs):
+        """Like `trace()` but each value is an array with one element per
+        environment. The result is the same as calling `trace()` for every
+        environment index in order, except that `EpisodicMetric`s keep the
+        partial returns of each environment apart. Scalars are used for every
+        environment, and a call with scalars only is a batch of one.
+        """
+        import numpy as np
+
+        kwargs = {k: np.asarray(v) for k, v in kwargs.items()}
+        keys = tuple(kwargs)
+        try:
+            plan = self._batch_plans[keys]
+        except KeyError:
+            plan = self._batch_plans[keys] = self._batch_plan(keys)
+
+        shape = np.broadcast_shapes((1,), *(v.shape for v in kwargs.values()))
+        for accumulate_batch, getters in plan:
+            accumulate_batch(*[np.broadcast_to(g(kwargs), shape) for g in getters])
 
     def reset(self):
         for metric in self.metrics.values():
             metric.reset()
 
-    def _updatable_metrics(self, kwargs):
-        """Return the metrics that have metargs appearing in kwargs"""
-        metrics = []
-        for metarg in kwargs:
-            for metric in self.metrics.values():
-                if metarg in metric.metargs:
-                    metrics.append(metric)
-        return set(metrics)
-
-    def _process(self, metargs, kwargs):
-        args = []
-        for metarg in metargs:
-            if isinstance(metarg, int | float):
-                # metarg is a number
-                args.append(metarg)
-            elif "(" in metarg:
-                # metarg is a function such as "clip(reward)"
-                fn_name = metarg.split("(")[0]  # get the 'f' in 'f(x)'
-                # get 'x' in 'f(x)'
-                fn_arg = re.search(r"\((.*?)\)", metarg).group(1)
-                args.append(FNS[fn_name](kwargs[fn_arg]))
-            else:
-                # metarg is a string we are tracing such as "lorem ipsum"
-                args.append(kwargs[metarg])
-        return args
+    def state(self):
+        """Returns the picklable `state()` of every metric, to be shipped to
+        another process and combined there with `merge()`.
+        """
+        return {name: metric.state() for name, metric in self.metrics.items()}
+
+    def merge(self, *states):
+        """Combines the `state()`s of Accumulators configured with the same
+        metrics, for example one per actor process, into this one.
+
+        Workers are expected to `reset()` after shipping their state, so that
+        every state covers a new interval. Metrics that are not resetable keep
+        accumulating on the workers and should be kept on the receiving side
+        only.
+        """
+        for state in states:
+            for name, metric_state in state.items():
+                self.metrics[name].merge(metric_state)
 
     def __repr__(self):
         return f"Accumulator[{', '.join([str(m) for m in self.metrics.values()])}]"
 
 
+class _ArrayView:
+    """Makes a metric a view of its elements in the arrays of an
+    `ArrayAccumulator`, so that its methods keep working on the shared state.
+    """
+
+    @property
+    def _val(self):
+        return self._store._val[self._id].item()
+
+    @_val.setter
+    def _val(self, val):
+        self._store._val[self._id] = val
+
+    @property
+    def _counter(self):
+        return self._store._counter[self._id].item()
+
+    @_counter.setter
+    def _counter(self, counter):
+        self._store._counter[self._id] = counter
+
+    @property
+    def _updated(self):
+        return self._store._updated[self._id].item()
+
+    @_updated.setter
+    def _updated(self, updated):
+        self._store._updated[self._id] = updated
+
+
+_VIEWS = {}  # metric class -> its _ArrayView subclass
+
+
+def _gather(metargs):
+    """Compiles metargs into a function returning their values, as a tuple, a
+    sequence or a single value, to be used with a NumPy index of the same
+    length.
+    """
+    if all(isinstance(m, int | float) for m in metargs):
+        values = tuple(metargs)
+        return lambda kwargs: values
+    getters = [compile_metarg(m)[0] for m in metargs]
+    if all(isinstance(g, itemgetter) for g in getters):
+        return itemgetter(*metargs)
+    return lambda kwargs: [g(kwargs) for g in getters]
+
+
+def _add_update(arr, idx, get):
+    def update(kwargs):
+        arr[idx] += get(kwargs)
+
+    return update
+
+
+def _max_update(np, arr, idx, get):
+    def update(kwargs):
+        arr[idx] = np.maximum(arr[idx], get(kwargs))
+
+    return update
+
+
+def _set_update(arr, idx, val):
+    def update(kwargs):
+        arr[idx] = val
+
+    return update
+
+
+class ArrayAccumulator(Accumulator):
+    """An `Accumulator` keeping the state of its `SumMetric`s, `AvgMetric`s
+    and `MaxMetric`s in NumPy arrays, with an element per metric.
+
+    A `trace()` updates all these metrics with a few array operations,
+    `summarize()` is a single vector division and `reset()` an array fill,
+    which pays off with hundreds of metrics. The metric objects become views
+    of their elements and keep working as before. Their values are floats
+    and they are summarized before the other metrics.
+    """
+
+    KINDS = {SumMetric: "sum", AvgMetric: "avg", MaxMetric: "max"}
+    INITIAL = {"sum": 0.0, "avg": 0.0, "max": -math.inf}
+
+    def __init__(self, *metrics, console_options=None):
+        import numpy as np
+
+        self._np = np
+        self._ids, self._kinds = {}, []  # name -> id, id -> kind
+        super().__init__(*metrics, console_options=console_options)
+
+    def add_metrics(self, *metrics):
+        super().add_metrics(*metrics)
+        # The arrays are rebuilt from `self.metrics`, without the elements of
+        # the metrics replaced by one of the same name.
+        np = self._np
+        state, kinds, ids = [], [], {}
+        for metric in self.metrics.values():
+            if isinstance(metric, _ArrayView):
+                store, idx = metric._store, metric._id
+                kind = store._kinds[idx]
+                val, counter = store._val[idx], store._counter[idx]
+                updated = store._updated[idx]
+            elif type(metric) in self.KINDS:
+                kind = self.KINDS[type(metric)]
+                val = metric.__dict__.pop("_val")
+                counter = metric.__dict__.pop("_counter", 0)
+                updated = metric.__dict__.pop("_updated")
+                cls = type(metric)
+                if cls not in _VIEWS:
+                    _VIEWS[cls] = type(cls.__name__, (_ArrayView, cls), {})
+                metric.__class__ = _VIEWS[cls]
+            else:
+                continue
+            state.append((val, counter, updated, metric))
+            ids[metric.name] = len(kinds)
+            kinds.append(kind)
+
+        self._val = np.array([s[0] for s in state], dtype=float)
+        self._counter = np.array([s[1] for s in state], dtype=float)
+        self._updated = np.array([s[2] for s in state], dtype=bool)
+        self._initial = np.array([self.INITIAL[k] for k in kinds], dtype=float)
+        self._resetable = np.array([s[3]._resetable for s in state], dtype=bool)
+        for idx, (*_, metric) in enumerate(state):
+            metric._store, metric._id = self, idx
+        self._ids, self._kinds, self._names = ids, kinds, list(ids)
+        self._objects = [m for m in self.metrics.values() if m.name not in ids]
+        self._reset_idx = np.flatnonzero(self._resetable)
+
+    def _plan(self, keys):
+        np = self._np
+        names = {name for key in keys for name in self._index.get(key, ())}
+        unary, nary = [], []
+        groups = {"add": ([], []), "count": ([], []), "max": ([], [])}
+        for name, metric in self.metrics.items():
+            if name not in names:
+                continue
+            if name not in self._ids:
+                getter, unpack = self._getters[name]
+                (nary if unpack else unary).append((metric.accumulate, getter))
+                continue
+            idx = self._ids[name]
+            if self._kinds[idx] == "max":
+                metric_groups = ("max",)
+            else:  # the value and, for averages, the count
+                metric_groups = ("add", "count")[: len(metric.metargs)]
+            for group, metarg in zip(metric_groups, metric.metargs, strict=True):
+                groups[group][0].append(idx)
+                groups[group][1].append(metarg)
+
+        updates = []
+        for group, (idx, metargs) in groups.items():
+            if not idx:
+                continue
+            arr = self._counter if group == "count" else self._val
+            idx, get = np.array(idx), _gather(metargs)
+            if group == "max":
+                updates.append(_max_update(np, arr, idx, get))
+            else:
+                updates.append(_add_update(arr, idx, get))
+        touched = groups["add"][0] + groups["max"][0]
+        if touched:
+            updates.append(_set_update(self._updated, np.array(touched), True))
+        return unary, nary, updates
+
+    def trace(self, **kwargs):
+        keys = tuple(kwargs)
+        try:
+            unary, nary, updates = self._plans[keys]
+        except KeyError:
+            unary, nary, updates = self._plans[keys] = self._plan(keys)
+        for update in updates:
+            update(kwargs)
+        for accumulate, get in unary:
+            accumulate(get(kwargs))
+        for accumulate, get in nary:
+            accumulate(*get(kwargs))
+
+    def summarize(self):
+        np = self._np
+        counter = self._counter
+        with np.errstate(divide="ignore", invalid="ignore"):
+            values = np.where(counter != 0, self._val / counter, self._val)
+        values = zip(self._names, values.tolist(), strict=True)
+        payload = dict(compress(values, self._updated.tolist()))
+        for metric in self._objects:
+            if metric.updated:
+                payload[metric.name] = metric.value
+        return payload
+
+    def reset(self):
+        idx = self._reset_idx
+        self._val[idx] = self._initial[idx]
+        self._counter[idx] = 0
+        self._updated[idx] = False
+        for metric in self._objects:
+            metric.reset()
+
+
 def main():
     N = 1000
 
@@ -325,8 +1308,7 @@ def main():
         ep += int(done)
 
     for k, v in group.summarize().items():
-        if k != "extra":
-            print(f"{k}:\t {v:>9,.1f}")
+        print(f"{k}:\t {v:>9,.1f}")
 
     print("-------")
     print(f"avg_returns:\t {(sum(control) / ep):>9,.1f}")
@@ -362,8 +1344,7 @@ def fancy():
         ep += done
 
     for k, v in log.summarize().items():
-        if k != "extra":
-            print(f"{k}:\t {v:>9,.1f}")
+        print(f"{k}:\t {v:>9,.1f}")
 
     print("-------")
     print(f"ep_cnt:\t {ep:>9,.1f}")
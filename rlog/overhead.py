@@ -0,0 +1,89 @@
+"""Opt-in measurement of the time spent inside rlog."""
+
+import threading
+from time import perf_counter_ns
+
+__all__ = ["OverheadMonitor"]
+
+
+class OverheadMonitor:
+    """Accumulates the time spent in instrumented methods, in nanoseconds.
+
+    `enable()` replaces methods of the given classes with timed wrappers and
+    `disable()` puts the originals back, so there is no cost when the monitor
+    is not in use. Times are kept per name and the names can be shared by
+    several methods. Nested calls, like the handlers called by `trace`, are
+    counted under their own name too, but only the outermost calls on the
+    thread that enabled the monitor add up to `total`. The records handled on
+    the writer thread of an `AsyncHandler` are thus reported but do not count
+    towards `total`.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._patched = []
+        self._local = threading.local()
+        self._thread = None
+        self.times, self.calls = {}, {}
+        self.reset()
+
+    def reset(self):
+        self.times.clear()
+        self.calls.clear()
+        self.total = 0
+        self._start = perf_counter_ns()
+
+    def enable(self, *targets):
+        """Instruments `targets`, tuples of `(cls, method_name, name)` where
+        `name` is either a string or a function of the arguments of the call
+        returning one, or None for the calls not to measure. `cls` can also be
+        a module.
+        """
+        if self.enabled:
+            return
+        for owner, attr, name in targets:
+            fn = owner.__dict__[attr]
+            self._patched.append((owner, attr, fn))
+            setattr(owner, attr, self._timed(fn, name))
+        self.enabled = True
+        self._thread = threading.get_ident()
+        self.reset()
+
+    def disable(self):
+        for owner, attr, fn in reversed(self._patched):
+            setattr(owner, attr, fn)
+        self._patched.clear()
+        self.enabled = False
+
+    def summary(self):
+        """Returns the time spent under each name, the `total` and the time
+        `elapsed` since the monitor was enabled or reset.
+        """
+        return {
+            **self.times,
+            "total": self.total,
+            "elapsed": perf_counter_ns() - self._start,
+        }
+
+    def _timed(self, fn, name):
+        local, times, calls = self._local, self.times, self.calls
+
+        def timed(*args, **kwargs):
+            key = name if isinstance(name, str) else name(*args)
+            if key is None:
+                return fn(*args, **kwargs)
+            depth = getattr(local, "depth", 0)
+            local.depth = depth + 1
+            start = perf_counter_ns()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = perf_counter_ns() - start
+                local.depth = depth
+                times[key] = times.get(key, 0) + elapsed
+                calls[key] = calls.get(key, 0) + 1
+                if depth == 0 and threading.get_ident() == self._thread:
+                    self.total += elapsed
+
+        timed.__wrapped__ = fn
+        return timed
@@ -0,0 +1,191 @@
+"""Loading the structured logs of many runs at once."""
+
+import glob
+import numbers
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .handlers import read_columns, read_pickle
+
+__all__ = ["load", "load_logger"]
+
+
+def _find_sources(path_or_glob):
+    """Returns the `.pkl` files and `.cols` folders under `path_or_glob`, as a
+    dict from `(run dir, logger)` to the source. A logger written by both a
+    `ColumnarHandler` and a `PickleHandler` is read from its columns.
+    """
+    pattern = str(path_or_glob)
+    if glob.has_magic(pattern):
+        paths = [Path(p) for p in sorted(glob.glob(pattern, recursive=True))]
+    else:
+        paths = [Path(path_or_glob)]
+
+    found = []
+    for path in paths:
+        if path.suffix in (".pkl", ".cols"):
+            found.append(path)
+        elif path.is_dir():
+            found.extend(path.rglob("*.pkl"))
+            found.extend(path.rglob("*.cols"))
+
+    sources = {}
+    for source in sorted(found, key=lambda p: p.suffix == ".cols"):
+        sources[(str(source.parent), source.stem)] = source
+    return sources
+
+
+def _logger_name(stem):
+    # `<timestamp>_<logger>`, as named by the handlers
+    timestamp, _, name = stem.partition("_")
+    return name if timestamp.isdigit() and name else stem
+
+
+def _to_columns(data):
+    """Converts the `{metric: [{"step", "value", "time"}]}` of a pickle to
+    `{metric: {"step": ndarray, "value": ndarray, "time": ndarray}}`, the
+    layout of `read_columns()`. Dict values are split into `metric/key`
+    columns, like `ColumnarHandler` does, and text is left out.
+    """
+    import numpy as np
+
+    rows = {}
+    for metric, entries in data.items():
+        if metric == "text":
+            continue
+        for entry in entries:
+            value = entry["value"]
+            if isinstance(value, dict):
+                fields = [(f"{metric}/{k}", v) for k, v in value.items()]
+            else:
+                fields = [(metric, value)]
+            for name, v in fields:
+                if isinstance(v, numbers.Real):
+                    row = entry["step"], v, entry["time"]
+                    rows.setdefault(name, []).append(row)
+
+    return {
+        metric: {
+            "step": np.fromiter((r[0] for r in rows_), np.int64, len(rows_)),
+            "value": np.fromiter((r[1] for r in rows_), np.float64, len(rows_)),
+            "time": np.fromiter((r[2] for r in rows_), np.float64, len(rows_)),
+        }
+        for metric, rows_ in rows.items()
+    }
+
+
+def _cache_path(source):
+    return source.with_name(source.name + ".npz")
+
+
+def _source_key(source):
+    stat = source.stat()
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def _read_cache(source):
+    import numpy as np
+
+    try:
+        with np.load(_cache_path(source)) as npz:
+            if npz["__source__"].tolist() != _source_key(source):
+                return None
+            data = {}
+            for key in npz.files:
+                if key != "__source__":
+                    column, _, metric = key.partition(":")
+                    data.setdefault(metric, {})[column] = npz[key]
+            return data
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _write_cache(source, data):
+    import numpy as np
+
+    arrays = {
+        f"{column}:{metric}": values
+        for metric, columns in data.items()
+        for column, values in columns.items()
+    }
+    cache_path = _cache_path(source)
+    tmp_path = cache_path.with_name(f".{cache_path.name}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            np.savez(f, __source__=np.array(_source_key(source)), **arrays)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        # a read-only results folder, for example
+        tmp_path.unlink(missing_ok=True)
+
+
+def load_logger(source, cache=True):
+    """Loads the pickle or the `.cols` folder of a single logger as
+    `{metric: {"step": ndarray, "value": ndarray, "time": ndarray}}`.
+
+    The arrays converted from a pickle are cached in a `.pkl.npz` file next
+    to it and reused for as long as the pickle does not change.
+    """
+    source = Path(source)
+    if source.suffix == ".cols":
+        return read_columns(source, mmap=False)
+
+    if cache and (data := _read_cache(source)) is not None:
+        return data
+    data = _to_columns(read_pickle(source))
+    if cache:
+        _write_cache(source, data)
+    return data
+
+
+def _to_frames(data):
+    import pandas as pd
+
+    return {metric: pd.DataFrame(columns) for metric, columns in data.items()}
+
+
+def load(path_or_glob, cache=True, processes=None, as_frame=None):
+    """Loads every run found under a folder or matching a glob pattern such
+    as `"results/sweep_*/**"`.
+
+    Returns `{run_dir: {logger: {metric: columns}}}` where `columns` is a dict
+    of NumPy arrays, `{"step": ..., "value": ..., "time": ...}`, or a pandas
+    DataFrame of these columns when `as_frame` is true. By default frames are
+    returned if pandas is installed. Loggers are named like their files,
+    without the timestamp, and the latest one wins if a run has several.
+
+    Pickles without a valid cache are converted on a pool of `processes`
+    worker processes, see `load_logger()` for the cache.
+    """
+    if as_frame is None:
+        try:
+            import pandas  # noqa: F401
+        except ImportError:
+            as_frame = False
+        else:
+            as_frame = True
+
+    sources = _find_sources(path_or_glob)
+    loaded, todo = {}, []
+    for key, source in sources.items():
+        data = _read_cache(source) if cache and source.suffix == ".pkl" else None
+        if data is None:
+            todo.append(key)
+        else:
+            loaded[key] = data
+
+    if len(todo) > 1 and processes != 1:
+        with ProcessPoolExecutor(processes) as pool:
+            results = pool.map(
+                load_logger, [sources[k] for k in todo], [cache] * len(todo)
+            )
+            loaded.update(zip(todo, results, strict=True))
+    else:
+        loaded.update((k, load_logger(sources[k], cache)) for k in todo)
+
+    runs = {}
+    for (run_dir, stem), data in sorted(loaded.items()):
+        run = runs.setdefault(run_dir, {})
+        run[_logger_name(stem)] = _to_frames(data) if as_frame else data
+    return runs
@@ -1,27 +1,36 @@
 """RLog definition and configuration."""
 
+import atexit
+import functools
+import importlib
 import logging
+import os
 import sys
+from time import perf_counter_ns
 
 from .exception_handling import print_fancy_err
 from .filters import MaxLevelFilter
 from .formatters import SummaryFormatter
-from .handlers import PickleHandler, TensorboardHandler
-from .metrics import (
-    Accumulator,
-    AvgMetric,
-    EpisodicMetric,
-    EWMAvgMetric,
-    FPSMetric,
-    MaxMetric,
-    SumMetric,
-    ValueMetric,
-)
+from .overhead import OverheadMonitor
+
+# The handlers, the metrics and the rest are imported on first use, see the
+# lazy attributes of the package in `rlog/__init__.py`.
 
 __all__ = [
     "getLogger",
     "getRootLogger",
     "init",
+    "configure",
+    "console",
+    "log_file",
+    "init_worker",
+    "worker_config",
+    "flush",
+    "flush_all",
+    "enable_overhead",
+    "disable_overhead",
+    "overhead",
+    "trace_overhead",
     "debug",
     "error",
     "exception",
@@ -30,63 +39,221 @@ __all__ = [
     "warning",
     "addMetrics",
     "put",
+    "put_batch",
     "summarize",
     "traceAndLog",
     "reset",
-    "PickleHandler",
-    "TensorboardHandler",
-    "Accumulator",
-    "AvgMetric",
-    "EpisodicMetric",
-    "EWMAvgMetric",
-    "FPSMetric",
-    "MaxMetric",
-    "SumMetric",
-    "ValueMetric",
+    "span",
 ]
 
 
 ROOT = None
+FORWARDING = None  # the worker_config() of the processes forwarding records
+BACKENDS = {"python": "Accumulator", "array": "ArrayAccumulator"}
+OVERHEAD = OverheadMonitor()
 
 
 logging.TRACE = 15
 logging.addLevelName(logging.TRACE, "TRACE")
 
 
+def _noop(**kwargs):
+    pass
+
+
+def _import(module, name):
+    return getattr(importlib.import_module(f".{module}", __package__), name)
+
+
+class Span:
+    """A section of code timed into a `TimerMetric` of the same name, see
+    `RLogger.span()`. Spans are cached and reused, so entering one only
+    pushes and pops the start time.
+    """
+
+    __slots__ = ("_logger", "name", "leaf", "children", "metric", "_starts")
+
+    def __init__(self, logger, name, leaf):
+        from .metrics import TimerMetric
+
+        self._logger = logger
+        self.name = name
+        self.leaf = leaf
+        self.children = {}
+        self.metric = TimerMetric(name)
+        self._starts = []
+        logger.addMetrics(self.metric)
+
+    def __enter__(self):
+        self._logger._open_spans.append(self)
+        self._starts.append(perf_counter_ns())
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metric.accumulate(perf_counter_ns() - self._starts.pop())
+        self._logger._open_spans.pop()
+
+    def __call__(self, fn):
+        # Decorated functions look up their span when called, so that its
+        # name follows the spans open at that point.
+        logger, leaf = self._logger, self.leaf
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            with logger.span(leaf):
+                return fn(*args, **kwargs)
+
+        return timed
+
+
 class RLogger(logging.Logger):
     def __init__(self, log_name=None):
         logging.Logger.__init__(self, log_name)
 
         self.accumulator = None
         self.put, self.reset, self.summarize, self.fmt = None, None, None, None
-        self._xtra_kws = ("exc_info", "extra", "stack_info")  # small helper
+        self.put_batch = None
+        self._metrics_enabled = True
+        self._xtra_kws = frozenset(("exc_info", "extra", "stack_info"))
+        self._spans = {}  # top-level spans, by name
+        self._open_spans = []
+        self._schema_version = 0  # of the last schema passed to the handlers
 
     def trace(self, *args, **kws):
+        # Nothing to do if no handler would receive the record.
+        if not (self.isEnabledFor(logging.TRACE) and self.hasTraceHandlers()):
+            return
+        if (
+            self.accumulator is not None
+            and self.accumulator.schema_version != self._schema_version
+        ):
+            self.handle(self._schema_record())
         # We break with the API for now.
         # And yes, logger takes its '*args' as 'args'.
         if args:
             self._log(logging.TRACE, args[0], args[1:], **kws)
         elif kws:
-            _xtra_kws = {k: v for k, v in kws.items() if k in self._xtra_kws}
-            self._log(logging.TRACE, kws, args, **_xtra_kws)
+            if self._xtra_kws.isdisjoint(kws):
+                self._log(logging.TRACE, kws, args)
+            else:
+                _xtra_kws = {k: v for k, v in kws.items() if k in self._xtra_kws}
+                self._log(logging.TRACE, kws, args, **_xtra_kws)
         else:
             raise TypeError("Call trace with either a message or a dict-like object.")
 
-    def addMetrics(self, *metrics):
+    def _schema_record(self):
+        """Returns a record describing the metrics to the handlers, passed to
+        them before the first summary and again when metrics are added. The
+        schema is in its `rlog_schema` attribute and only handlers with a true
+        `handles_schemas` attribute get such records.
+        """
+        version = self._schema_version = self.accumulator.schema_version
+        metrics = self.accumulator.schema()
+        schema = {"version": version, "logger": self.name, "metrics": metrics}
+        msg = f"Schema v{version}: {', '.join(metrics)}"
+        return self.makeRecord(
+            self.name,
+            logging.TRACE,
+            "(unknown file)",
+            0,
+            msg,
+            (),
+            None,
+            extra={"rlog_schema": schema},
+        )
+
+    def callHandlers(self, record):
+        if not hasattr(record, "rlog_schema"):
+            logging.Logger.callHandlers(self, record)
+            return
+        for handler in _handlers(self):
+            schemas = getattr(handler, "handles_schemas", False)
+            if schemas and record.levelno >= handler.level:
+                handler.handle(record)
+
+    def hasTraceHandlers(self):
+        """Checks if any of the handlers this logger propagates to accepts
+        TRACE records, like the structured handlers do.
+        """
+        logger = self
+        while logger:
+            for handler in logger.handlers:
+                if handler.level <= logging.TRACE:
+                    return True
+            if not logger.propagate:
+                break
+            logger = logger.parent
+        return False
+
+    def addMetrics(self, *metrics, backend="python"):
+        """Adds metrics accumulating the values passed to `put`. The first call
+        picks the `backend` of the logger's Accumulator, either "python" or
+        "array" for an `ArrayAccumulator`, faster with hundreds of metrics.
+        """
         # TODO: Not really happy about how adding metrics changes the
         # interface of RLogger, need to thing about something else.
 
         if self.accumulator is None:
             # configure the Accumulator
-            self.accumulator = Accumulator(*metrics)
+            try:
+                accumulator_cls = _import("metrics", BACKENDS[backend])
+            except KeyError as err:
+                raise ValueError(
+                    f"Backend should be one of {tuple(BACKENDS)}, not {backend}."
+                ) from err
+            self.accumulator = accumulator_cls(*metrics)
+            if self.fmt is None:
+                self.fmt = SummaryFormatter(metrics=self.accumulator.metrics)
             # and delegate its methods
-            self.put = self.accumulator.trace
             self.reset = self.accumulator.reset
             self.summarize = self.accumulator.summarize
+            self._bind_put()
         else:
             # just add more metrics
             self.accumulator.add_metrics(*metrics)
 
+    def span(self, name):
+        """Times a section of code, as a context manager or a decorator:
+
+            with log.span("replay_sample"):
+                batch = replay.sample()
+
+        Durations are accumulated in a `TimerMetric` added to the logger on
+        first use and summarized with the other metrics. Spans opened inside
+        another span get hierarchical names, such as "update/backward".
+        Spans keep their state on the logger, use them from a single thread.
+        """
+        if self._open_spans:
+            parent = self._open_spans[-1]
+            spans, prefix = parent.children, parent.name + "/"
+        else:
+            spans, prefix = self._spans, ""
+        try:
+            return spans[name]
+        except KeyError:
+            span = spans[name] = Span(self, prefix + name, name)
+            return span
+
+    def disableMetrics(self):
+        """Makes `put` and `put_batch` no-ops, for example for the loggers
+        of an evaluation that is not reported.
+        """
+        self._metrics_enabled = False
+        self._bind_put()
+
+    def enableMetrics(self):
+        self._metrics_enabled = True
+        self._bind_put()
+
+    def _bind_put(self):
+        if not self._metrics_enabled:
+            self.put, self.put_batch = _noop, _noop
+        elif self.accumulator is not None:
+            self.put = self.accumulator.trace
+            self.put_batch = self.accumulator.trace_batch
+        else:
+            self.put, self.put_batch = None, None
+
     def traceAndLog(self, step, with_reset=True):
         """Calls both trace and summarize on the `Accumulator.summarize()`
         result. Then it calls reset.
@@ -95,7 +262,8 @@ class RLogger(logging.Logger):
             self.fmt = SummaryFormatter()
 
         summary = self.summarize()
-        self.info(self.fmt(step=step, **summary))
+        if self.isEnabledFor(logging.INFO):
+            self.info(self.fmt(step=step, **summary))
         self.trace(step=step, **summary)
         if with_reset:
             self.reset()
@@ -122,24 +290,7 @@ class TimeFilter(logging.Filter):
         return True
 
 
-def init(  # pylint: disable=bad-continuation
-    name,
-    path=None,
-    level=logging.INFO,
-    pickle=True,
-    tensorboard=False,
-    relative_time=False,
-    datefmt="%H:%M:%S",
-    timestamp=None,
-    prefix=None,
-):
-    """Configures a global RLogger."""
-    global ROOT
-
-    logging.setLoggerClass(RLogger)
-    ROOT = logging.getLogger(name)
-    ROOT.setLevel(logging.TRACE)
-
+def _formatter(relative_time=False, datefmt="%H:%M:%S", prefix=None):
     if relative_time:
         fmt = "{relative} [{levelname[0]}] {name}: {message}"
     else:
@@ -148,12 +299,19 @@ def init(  # pylint: disable=bad-continuation
     if prefix:
         fmt = prefix + fmt
 
-    formatter = logging.Formatter(
+    return logging.Formatter(
         fmt=fmt,
         datefmt=datefmt,
         style="{",
     )
 
+
+def console(level=logging.INFO, relative_time=False, datefmt="%H:%M:%S", prefix=None):
+    """Returns the handlers printing the records of `level` and above, on
+    stdout up to warnings and on stderr from warnings on.
+    """
+    formatter = _formatter(relative_time, datefmt, prefix)
+
     stdout_ch = logging.StreamHandler(sys.stdout)
     stderr_ch = logging.StreamHandler(sys.stderr)
 
@@ -170,27 +328,226 @@ def init(  # pylint: disable=bad-continuation
     # set the formatter
     stdout_ch.setFormatter(formatter)
     stderr_ch.setFormatter(formatter)
+    return [stdout_ch, stderr_ch]
+
+
+def log_file(
+    path,
+    level=logging.INFO,
+    relative_time=False,
+    datefmt="%H:%M:%S",
+    prefix=None,
+    flush_secs=5.0,
+):
+    """Returns a handler writing the records of `level` and above to
+    `path/log.log`. The file is created with the first record and written
+    every `flush_secs` seconds, or right away for warnings and errors, see
+    `BufferedFileHandler`.
+    """
+    from .handlers import BufferedFileHandler
+
+    fh = BufferedFileHandler(f"{path}/log.log", flush_secs=flush_secs)
+    if relative_time:
+        fh.addFilter(TimeFilter(datefmt=datefmt))
+    fh.setFormatter(_formatter(relative_time, datefmt, prefix))
+    fh.setLevel(level)
+    return fh
+
+
+def configure(
+    name,
+    *sinks,
+    async_io=False,
+    queue_size=10_000,
+    backpressure="block",
+    overhead=False,
+    mp_forwarding=False,
+):
+    """Configures a global RLogger writing to `sinks`, handlers or lists of
+    handlers, which can be composed as needed:
+
+        rlog.configure(
+            "dqn",
+            rlog.console(relative_time=True),
+            rlog.log_file(path),
+            rlog.PickleHandler(path, append=True),
+            rlog.TensorboardHandler(path),
+        )
+
+    The handlers of rlog open their files when they write the first record, so
+    a sink costs nothing until it is used.
+
+    With `async_io=True` the handlers that are not a `logging.StreamHandler`,
+    such as the structured ones, run on a writer thread. The other arguments
+    are the ones of `init()`.
+    """
+    global ROOT, FORWARDING
+
+    logging.setLoggerClass(RLogger)
+    ROOT = logging.getLogger(name)
+    ROOT.setLevel(logging.TRACE)
+
+    handlers = []
+    for sink in sinks:
+        handlers.extend(sink if isinstance(sink, list | tuple) else (sink,))
+
+    streams = [h for h in handlers if isinstance(h, logging.StreamHandler)]
+    structured = [h for h in handlers if not isinstance(h, logging.StreamHandler)]
+
+    if async_io and structured:
+        from .handlers import AsyncHandler
+
+        ah = AsyncHandler(*structured, maxsize=queue_size, policy=backpressure)
+        ah.setLevel(min(h.level for h in structured))
+        structured = [ah]
 
     ROOT.handlers.clear()
 
-    ROOT.addHandler(stdout_ch)
-    ROOT.addHandler(stderr_ch)
+    for handler in streams + structured:
+        ROOT.addHandler(handler)
+    _resend_schemas()
+
+    if overhead:
+        enable_overhead()
+
+    if FORWARDING is not None and "listener" in FORWARDING:
+        FORWARDING["listener"].stop()
+    FORWARDING = None
+    if mp_forwarding:
+        import multiprocessing
+
+        from .forwarding import ForwardingListener
+
+        method = None if mp_forwarding is True else mp_forwarding
+        queue = multiprocessing.get_context(method).Queue()
+        FORWARDING = {
+            "name": name,
+            "queue": queue,
+            "level": min([logging.TRACE, *(h.level for h in handlers)]),
+            "listener": ForwardingListener(queue),
+        }
+
+
+def init(  # pylint: disable=bad-continuation
+    name,
+    path=None,
+    level=logging.INFO,
+    pickle=True,
+    append_pickle=False,
+    columnar=False,
+    tensorboard=False,
+    relative_time=False,
+    datefmt="%H:%M:%S",
+    timestamp=None,
+    prefix=None,
+    async_io=False,
+    queue_size=10_000,
+    backpressure="block",
+    overhead=False,
+    mp_forwarding=False,
+):
+    """Configures a global RLogger.
+
+    With `append_pickle=True` the `PickleHandler` appends a chunk per record
+    instead of rewriting the whole file, see `read_pickle()` for loading it.
+    With `columnar=True` traced metrics are also stored as memory-mappable
+    columns by a `ColumnarHandler`, see `read_columns()`.
+
+    With `async_io=True` the structured handlers run on a writer thread behind
+    an `AsyncHandler` with a queue of `queue_size` records, and `backpressure`
+    is the policy used when the queue is full ("block", "drop-oldest" or
+    "sample"). Call `rlog.flush()` to wait for the queued records.
+
+    With `overhead=True` the time spent in rlog is measured, see
+    `rlog.overhead()`.
+
+    With `mp_forwarding=True` worker processes send their records to this
+    process, whose handlers are then the only ones writing the log files.
+    Forked workers are configured on their own, others need to call
+    `rlog.init_worker()` with the `rlog.worker_config()` of this process.
+    `mp_forwarding` can also be the start method, such as "spawn", of the
+    workers, when it is not the default one.
+
+    See `configure()` for choosing the handlers one by one.
+    """
+    sinks = [console(level, relative_time, datefmt, prefix)]
 
     if path:
-        fh = logging.FileHandler(f"{path}/log.log")
-        fh.setFormatter(formatter)
-        fh.setLevel(level)
-        ROOT.addHandler(fh)
+        from .handlers import ColumnarHandler, PickleHandler, TensorboardHandler
+
+        sinks.append(log_file(path, level, relative_time, datefmt, prefix))
+
+        structured = []
 
         if pickle:
-            ph = PickleHandler(path, timestamp=timestamp)
-            ph.setLevel(logging.TRACE)
-            ROOT.addHandler(ph)
+            structured.append(
+                PickleHandler(path, timestamp=timestamp, append=append_pickle)
+            )
+
+        if columnar:
+            structured.append(ColumnarHandler(path, timestamp=timestamp))
 
         if tensorboard:
-            swh = TensorboardHandler(path)
-            swh.setLevel(logging.TRACE)
-            ROOT.addHandler(swh)
+            structured.append(TensorboardHandler(path))
+
+        for handler in structured:
+            handler.setLevel(logging.TRACE)
+
+        sinks.extend(structured)
+
+    configure(
+        name,
+        *sinks,
+        async_io=async_io,
+        queue_size=queue_size,
+        backpressure=backpressure,
+        overhead=overhead,
+        mp_forwarding=mp_forwarding,
+    )
+
+
+def worker_config():
+    """Returns what `init_worker()` needs to forward the records of a worker
+    process to this one. Pass it to the worker as an argument of its
+    `multiprocessing.Process`.
+    """
+    if FORWARDING is None:
+        raise RuntimeError("Call `rlog.init(..., mp_forwarding=True)` first.")
+    return {k: v for k, v in FORWARDING.items() if k != "listener"}
+
+
+def init_worker(config, batch_size=64, flush_secs=1.0):
+    """Configures the global RLogger of a worker process to forward its
+    records, in batches of `batch_size`, to the process that created `config`
+    with `worker_config()`.
+    """
+    global ROOT, FORWARDING
+    from .forwarding import ForwardingHandler
+    from .handlers import AsyncHandler
+
+    logging.setLoggerClass(RLogger)
+    ROOT = logging.getLogger(config["name"])
+    ROOT.setLevel(logging.TRACE)
+    for handler in ROOT.handlers:
+        # the files belong to the parent, do not flush its buffers again
+        if isinstance(handler, AsyncHandler):
+            atexit.unregister(handler.close)
+    ROOT.handlers.clear()
+
+    handler = ForwardingHandler(config["queue"], batch_size, flush_secs)
+    handler.setLevel(config["level"])
+    ROOT.addHandler(handler)
+    _resend_schemas()
+    FORWARDING = config
+
+
+def _after_fork_in_child():
+    if FORWARDING is not None:
+        init_worker({k: v for k, v in FORWARDING.items() if k != "listener"})
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork_in_child)
 
 
 def getLogger(name):
@@ -201,6 +558,178 @@ def getRootLogger():
     return ROOT
 
 
+def flush():
+    """Flushes the handlers of the root logger. With `async_io` this waits for
+    the writer thread to process all the queued records.
+    """
+    for handler in ROOT.handlers:
+        handler.flush()
+
+
+def _handlers(logger):
+    # the handlers `logger.callHandlers()` would pass a record to
+    handlers = []
+    while logger:
+        handlers.extend(logger.handlers)
+        if not logger.propagate:
+            break
+        logger = logger.parent
+    return handlers
+
+
+def _summary_records(logger, step):
+    summary = logger.summarize()
+    records = []
+    if logger.isEnabledFor(logging.INFO):
+        if logger.fmt is None:
+            logger.fmt = SummaryFormatter()
+        msg = logger.fmt(step=step, **summary)
+        records.append(
+            logger.makeRecord(
+                logger.name, logging.INFO, "(unknown file)", 0, msg, (), None
+            )
+        )
+    if logger.isEnabledFor(logging.TRACE):
+        if logger.accumulator.schema_version != logger._schema_version:
+            records.append(logger._schema_record())
+        msg = {"step": step, **summary}
+        records.append(
+            logger.makeRecord(
+                logger.name, logging.TRACE, "(unknown file)", 0, msg, (), None
+            )
+        )
+    return summary, records
+
+
+def flush_all(step, with_reset=True):
+    """Does `traceAndLog(step)` for the root logger and every RLogger with
+    metrics under it, such as "dqn.train" and "dqn.eval", but summarizes them
+    all first and then passes the records to each handler in one batch. A
+    `PickleHandler` thus rewrites each file once and a `ColumnarHandler`
+    flushes its files once per call instead of once per logger.
+
+    Returns the summaries, by logger name.
+    """
+    from .handlers import handle_batch
+
+    prefix = ROOT.name + "."
+    loggers = [ROOT] + [
+        logger
+        for name, logger in sorted(logging.Logger.manager.loggerDict.items())
+        if name.startswith(prefix) and isinstance(logger, RLogger)
+    ]
+
+    summaries, batches = {}, {}  # handler -> records, in order
+    for logger in loggers:
+        if logger.accumulator is None or logger.disabled:
+            continue
+        summaries[logger.name], records = _summary_records(logger, step)
+        for record in records:
+            if logger.filter(record):
+                for handler in _handlers(logger):
+                    batches.setdefault(handler, []).append(record)
+        if with_reset:
+            logger.reset()
+
+    for handler, records in batches.items():
+        handle_batch(handler, records)
+    return summaries
+
+
+def _emit_name(handler, record):
+    # the records of other libraries reach `logging.Handler.handle` too
+    if ROOT is None or not f"{record.name}.".startswith(f"{ROOT.name}."):
+        return None
+    return "emit/" + type(handler).__name__
+
+
+def _batch_emit_name(handler, records):
+    return "emit/" + type(handler).__name__
+
+
+def _resend_schemas():
+    # new handlers need the schemas the previous ones got
+    for logger in logging.Logger.manager.loggerDict.values():
+        if isinstance(logger, RLogger):
+            logger._schema_version = 0
+
+
+def _rebind_metrics():
+    # RLoggers hold bound methods of their Accumulator, get the current ones.
+    for logger in logging.Logger.manager.loggerDict.values():
+        if isinstance(logger, RLogger) and logger.accumulator is not None:
+            logger.summarize = logger.accumulator.summarize
+            logger._bind_put()
+
+
+def _accumulator_targets():
+    # the methods of Accumulator and of the subclasses overriding them, such
+    # as ArrayAccumulator
+    from .metrics import Accumulator
+
+    classes = [Accumulator]
+    for cls in classes:
+        classes.extend(cls.__subclasses__())
+    methods = (("trace", "put"), ("trace_batch", "put"), ("summarize", "summarize"))
+    return [
+        (cls, attr, name)
+        for cls in classes
+        for attr, name in methods
+        if attr in cls.__dict__
+    ]
+
+
+def enable_overhead():
+    """Starts measuring the time spent in `put`, `put_batch`, `summarize`,
+    `trace`, in the `SummaryFormatter` and in the `handle` method of each
+    handler class, or in `handle_batch()` for the batches of `flush_all()`.
+    Only the records of the loggers under the root logger are measured. Each
+    of them has a cost only while this is enabled.
+    """
+    from . import handlers
+
+    OVERHEAD.enable(
+        *_accumulator_targets(),
+        (RLogger, "trace", "trace"),
+        (SummaryFormatter, "__call__", "format"),
+        (logging.Handler, "handle", _emit_name),
+        # the batches of `flush_all()` and `AsyncHandler` skip `handle()`
+        (handlers, "handle_batch", _batch_emit_name),
+    )
+    _rebind_metrics()
+
+
+def disable_overhead():
+    OVERHEAD.disable()
+    _rebind_metrics()
+
+
+def overhead(reset=False):
+    """Returns the nanoseconds spent in rlog since `enable_overhead()` or the
+    last reset, like `{"put": 1200, "trace": 800, "emit/PickleHandler": 700,
+    ..., "total": 2300, "elapsed": 100000}`. Handlers are called by `trace`
+    so their time is also part of it, while `total` counts each nanosecond
+    once. The fraction of the run spent logging is `total / elapsed`.
+    """
+    summary = OVERHEAD.summary()
+    if reset:
+        OVERHEAD.reset()
+    return summary
+
+
+def trace_overhead(step, logger=None, reset=True):
+    """Traces the result of `overhead()` on `logger`, the root logger by
+    default, as `rlog/overhead/*` metrics in milliseconds, along with the
+    `rlog/overhead/fraction` of the elapsed time spent logging.
+    """
+    logger = logger or ROOT
+    summary = overhead(reset=reset)
+    elapsed = summary.pop("elapsed")
+    metrics = {f"rlog/overhead/{k}": v / 1e6 for k, v in summary.items()}
+    metrics["rlog/overhead/fraction"] = summary["total"] / elapsed
+    logger.trace(step=step, **metrics)
+
+
 def debug(msg, *args, **kwargs):
     ROOT.debug(msg, *args, **kwargs)
 
@@ -225,9 +754,9 @@ def warning(msg, *args, **kwargs):
     ROOT.warning(msg, *args, **kwargs)
 
 
-def addMetrics(*metrics):
+def addMetrics(*metrics, backend="python"):
     root = getRootLogger()
-    root.addMetrics(*metrics)
+    root.addMetrics(*metrics, backend=backend)
 
 
 def put(**kwargs):
@@ -243,6 +772,19 @@ def put(**kwargs):
         raise
 
 
+def put_batch(**kwargs):
+    root = getRootLogger()
+    try:
+        root.put_batch(**kwargs)
+    except AttributeError as err:
+        print_fancy_err(
+            err,
+            issue="RLog has no attribute `put_batch` untill you add a Metric",
+            fix="You do so by calling `addMetric(...)` first",
+        )
+        raise
+
+
 def summarize():
     root = getRootLogger()
     try:
@@ -269,6 +811,10 @@ def traceAndLog(step, with_reset=True):
         raise
 
 
+def span(name):
+    return getRootLogger().span(name)
+
+
 def reset():
     root = getRootLogger()
     try:
@@ -0,0 +1,247 @@
+"""A TensorBoard event file writer that does not need PyTorch or TensorFlow.
+
+Event files are TFRecord files: a sequence of records, each holding an `Event`
+protobuf and framed by its length and masked CRC32C checksums. The few
+messages we need (scalars, histograms and text summaries) are encoded by hand.
+"""
+
+import bisect
+import math
+import os
+import socket
+import struct
+import time
+from pathlib import Path
+
+__all__ = ["EventFileWriter"]
+
+
+def _make_crc_table():
+    poly = 0x82F63B78  # Castagnoli, reversed
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC_TABLE = _make_crc_table()
+
+
+def crc32c(data):
+    crc = 0xFFFFFFFF
+    table = _CRC_TABLE
+    for byte in data:
+        crc = table[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def masked_crc32c(data):
+    crc = crc32c(data)
+    return (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+
+
+def tfrecord(data):
+    """Frames `data` as a TFRecord."""
+    header = struct.pack("<Q", len(data))
+    return b"".join(
+        (
+            header,
+            struct.pack("<I", masked_crc32c(header)),
+            data,
+            struct.pack("<I", masked_crc32c(data)),
+        )
+    )
+
+
+# Protobuf wire format. Only the types used by the messages below.
+
+
+def _varint(n):
+    n &= 0xFFFFFFFFFFFFFFFF  # negative int64 are ten bytes long
+    out = bytearray()
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+    return bytes(out)
+
+
+def _int_field(field, n):
+    return _varint(field << 3) + _varint(n)
+
+
+def _double_field(field, x):
+    return _varint(field << 3 | 1) + struct.pack("<d", x)
+
+
+def _float_field(field, x):
+    return _varint(field << 3 | 5) + struct.pack("<f", x)
+
+
+def _bytes_field(field, data):
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return _varint(field << 3 | 2) + _varint(len(data)) + data
+
+
+def _packed_doubles(field, xs):
+    return _bytes_field(field, struct.pack(f"<{len(xs)}d", *xs))
+
+
+# tensorflow/core/util/event.proto and tensorflow/core/framework/summary.proto
+
+
+def _event(step, wall_time, summary_values=(), file_version=None):
+    parts = [_double_field(1, wall_time), _int_field(2, step)]
+    if file_version is not None:
+        parts.append(_bytes_field(3, file_version))
+    if summary_values:
+        summary = b"".join(_bytes_field(1, v) for v in summary_values)
+        parts.append(_bytes_field(5, summary))
+    return b"".join(parts)
+
+
+def _scalar_value(tag, value):
+    return _bytes_field(1, tag) + _float_field(2, value)
+
+
+def _histogram_value(tag, min, max, num, sum, sum_squares, limits, counts):
+    histo = b"".join(
+        (
+            _double_field(1, min),
+            _double_field(2, max),
+            _double_field(3, num),
+            _double_field(4, sum),
+            _double_field(5, sum_squares),
+            _packed_doubles(6, limits),
+            _packed_doubles(7, counts),
+        )
+    )
+    return _bytes_field(1, tag) + _bytes_field(5, histo)
+
+
+def _text_value(tag, text):
+    plugin_data = _bytes_field(1, "text")
+    metadata = _bytes_field(1, plugin_data)
+    shape = _bytes_field(2, _int_field(1, 1))  # a single dim of size 1
+    tensor = _int_field(1, 7) + _bytes_field(2, shape) + _bytes_field(8, text)
+    return _bytes_field(1, tag) + _bytes_field(8, tensor) + _bytes_field(9, metadata)
+
+
+class EventFileWriter:
+    """Writes scalars, histograms and text to a TensorBoard event file.
+
+    The method names and arguments follow `torch.utils.tensorboard`'s
+    `SummaryWriter`. Encoded records are kept in a buffer that is written in
+    one go when it holds more than `max_buffer` bytes, when `flush_secs`
+    passed since the last write, or on `flush()` and `close()`.
+    """
+
+    def __init__(self, log_dir, flush_secs=10, max_buffer=1 << 20):
+        self.log_dir = log_dir
+        self.flush_secs = flush_secs
+        self.max_buffer = max_buffer
+        Path(log_dir).mkdir(parents=True, exist_ok=True)
+        file_name = "events.out.tfevents.{:010d}.{}.{}.0".format(
+            int(time.time()), socket.gethostname(), os.getpid()
+        )
+        self.file_path = Path(log_dir, file_name)
+        self._file = open(self.file_path, "ab")  # noqa: SIM115
+        self._buffer, self._buffered = [], 0
+        self._last_flush = time.monotonic()
+        self._add_event(_event(0, time.time(), file_version="brain.Event:2"))
+        self.flush()
+
+    def _add_event(self, event):
+        record = tfrecord(event)
+        self._buffer.append(record)
+        self._buffered += len(record)
+        if (
+            self._buffered >= self.max_buffer
+            or time.monotonic() - self._last_flush >= self.flush_secs
+        ):
+            self.flush()
+
+    def add_scalar(self, tag, scalar_value, global_step=None, walltime=None):
+        walltime = time.time() if walltime is None else walltime
+        value = _scalar_value(tag, scalar_value)
+        self._add_event(_event(global_step or 0, walltime, (value,)))
+
+    def add_scalar_series(self, tag, values, first_step, walltime=None):
+        """Adds `values` as scalars at consecutive steps, starting with
+        `first_step`, in a single buffered write.
+        """
+        walltime = time.time() if walltime is None else walltime
+        records = [
+            tfrecord(_event(first_step + i, walltime, (_scalar_value(tag, v),)))
+            for i, v in enumerate(values)
+        ]
+        self._buffer.extend(records)
+        self._buffered += sum(len(r) for r in records)
+        if self._buffered >= self.max_buffer:
+            self.flush()
+
+    def add_histogram(self, tag, values, global_step=None, bins=30, walltime=None):
+        values = sorted(values)
+        if not values:
+            return
+        lo, hi = values[0], values[-1]
+        width = (hi - lo) / bins
+        limits = [lo + width * (i + 1) for i in range(bins)] if width else [hi]
+        limits[-1] = hi
+        counts, start = [], 0
+        for limit in limits:
+            end = bisect.bisect_right(values, limit)
+            counts.append(end - start)
+            start = end
+        self.add_histogram_raw(
+            tag,
+            min=lo,
+            max=hi,
+            num=len(values),
+            sum=math.fsum(values),
+            sum_squares=math.fsum(v * v for v in values),
+            bucket_limits=limits,
+            bucket_counts=counts,
+            global_step=global_step,
+            walltime=walltime,
+        )
+
+    def add_histogram_raw(
+        self,
+        tag,
+        min,
+        max,
+        num,
+        sum,
+        sum_squares,
+        bucket_limits,
+        bucket_counts,
+        global_step=None,
+        walltime=None,
+    ):
+        walltime = time.time() if walltime is None else walltime
+        value = _histogram_value(
+            tag, min, max, num, sum, sum_squares, bucket_limits, bucket_counts
+        )
+        self._add_event(_event(global_step or 0, walltime, (value,)))
+
+    def add_text(self, tag, text_string, global_step=None, walltime=None):
+        walltime = time.time() if walltime is None else walltime
+        value = _text_value(tag, text_string)
+        self._add_event(_event(global_step or 0, walltime, (value,)))
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(b"".join(self._buffer))
+            self._buffer, self._buffered = [], 0
+        self._file.flush()
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
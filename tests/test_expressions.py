@@ -0,0 +1,63 @@
+import pytest
+
+import rlog
+from rlog.expressions import compile_metarg
+from rlog.metrics import Accumulator, AvgMetric, SumMetric
+
+
+def _eval(metarg, vectorized=False, **kwargs):
+    get, keys = compile_metarg(metarg, vectorized)
+    return get(kwargs), keys
+
+
+class TestCompileMetarg:
+    def test_keys_and_constants(self):
+        assert _eval("reward", reward=2) == (2, ("reward",))
+        assert _eval(1) == (1, ())
+        assert _eval("lorem ipsum", **{"lorem ipsum": 3}) == (3, ("lorem ipsum",))
+        assert _eval("loss/td", **{"loss/td": 3}) == (3, ("loss/td",))
+        assert _eval("q-value", **{"q-value": 4}) == (4, ("q-value",))
+
+    def test_slash_key_in_accumulator(self):
+        acc = Accumulator(AvgMetric("td", metargs=["loss/td", 1]))
+        acc.trace(**{"loss/td": 3})
+        assert acc.summarize()["td"] == 3
+
+    def test_expressions(self):
+        assert _eval("clip(reward)", reward=7) == (1, ("reward",))
+        assert _eval("clip(reward, -2, 2)", reward=7) == (2, ("reward",))
+        assert _eval("reward * (1 - done)", reward=3, done=True) == (
+            0,
+            ("reward", "done"),
+        )
+        assert _eval("abs(td_err) ** 2", td_err=-3) == (9, ("td_err",))
+        assert _eval("max(a, b) > 1", a=1, b=2) == (True, ("a", "b"))
+
+    def test_refused(self):
+        with pytest.raises(ValueError, match="Unknown function"):
+            compile_metarg("exp(reward)")
+        with pytest.raises(ValueError, match="Unsupported"):
+            compile_metarg("abs(reward).__class__")
+        with pytest.raises(ValueError, match="Unsupported"):
+            compile_metarg("[abs(x) for x in reward]")
+        with pytest.raises(ValueError, match="Invalid"):
+            compile_metarg("clip(reward")
+
+    def test_vectorized(self):
+        np = pytest.importorskip("numpy")
+        reward = np.array([-3.0, 0.5, 3.0])
+        value, _ = _eval("clip(reward, -2, 2)", vectorized=True, reward=reward)
+        assert value.tolist() == [-2.0, 0.5, 2.0]
+        value, _ = _eval("min(reward, 0)", vectorized=True, reward=reward)
+        assert value.tolist() == [-3.0, 0.0, 0.0]
+
+    def test_register_function(self):
+        rlog.register_function("double", lambda x: 2 * x)
+        acc = Accumulator(
+            SumMetric("doubled", metargs=["double(reward)"]),
+            AvgMetric("R_alive", metargs=["reward * (1 - done)", 1]),
+        )
+        acc.trace(reward=2, done=False)
+        acc.trace(reward=4, done=True)
+        assert acc.summarize()["doubled"] == 12
+        assert acc.summarize()["R_alive"] == 1
@@ -0,0 +1,28 @@
+import rlog
+from rlog.formatters import SummaryFormatter
+
+
+class TestSummaryFormatter:
+    def test_format(self):
+        fmt = SummaryFormatter()
+        line = fmt(step=10, loss=0.5, frames=4, err=None, q={"p50": 1.0}, hist=[1])
+        assert line == "[000010] loss=0.50, frames=4.00"
+
+    def test_plans_are_cached(self):
+        fmt = SummaryFormatter()
+        assert fmt(step=1, loss=0.5, R=None) == "[000001] loss=0.50"
+        assert fmt(step=2, loss=0.25, R=None) == "[000002] loss=0.25"
+        assert len(fmt._plans) == 1
+        assert fmt(step=3, loss=0.25, R=1.0) == "[000003] loss=0.25, R=1.00"
+        assert len(fmt._plans) == 2
+
+    def test_specs_and_emph(self):
+        metrics = {"R": rlog.AvgMetric("R", emph=True, metargs=["reward", 1])}
+        fmt = SummaryFormatter(specs={"lr": ".0e"}, metrics=metrics)
+        assert fmt(step=1, lr=0.001, R=2.0) == "[000001] R=2.00 | lr=1e-03"
+
+        fmt.set_specs(R="6.1f", lr=".1e")
+        assert fmt(step=1, lr=0.001, R=2.0) == "[000001] R=   2.0 | lr=1.0e-03"
+
+    def test_braces_in_names(self):
+        assert SummaryFormatter()(step=1, **{"q{0}": 1.0}) == "[000001] q{0}=1.00"
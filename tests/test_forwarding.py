@@ -0,0 +1,88 @@
+import logging
+import multiprocessing
+
+import pytest
+
+import rlog
+from rlog import rlogger
+from rlog.forwarding import ForwardingHandler
+from rlog.handlers import read_pickle
+
+from .test_handlers import ListHandler
+
+
+def _forked_actor(i):
+    log = rlog.getLogger("test_fwd.actor")
+    for step in range(100):
+        log.trace(step=step, actor=i)
+    log.info("actor %d done", i)
+
+
+def _spawned_actor(config):
+    rlog.init_worker(config)
+    _forked_actor(0)
+
+
+def _read_steps(tmp_path):
+    (file_path,) = tmp_path.glob("*_test_fwd_actor.pkl")
+    return read_pickle(file_path)
+
+
+class TestForwarding:
+    @pytest.fixture(autouse=True)
+    def _stop_forwarding(self):
+        yield
+        rlog.init("test_fwd_done")
+
+    def test_fork(self, tmp_path):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            pytest.skip("needs fork")
+        rlog.init("test_fwd", path=tmp_path, append_pickle=True, mp_forwarding="fork")
+        ctx = multiprocessing.get_context("fork")
+        actors = [ctx.Process(target=_forked_actor, args=(i,)) for i in range(3)]
+        for actor in actors:
+            actor.start()
+        for actor in actors:
+            actor.join()
+        rlogger.FORWARDING["listener"].stop()
+
+        data = _read_steps(tmp_path)
+        assert len(data["actor"]) == 300
+        assert {entry["value"] for entry in data["actor"]} == {0, 1, 2}
+        assert sorted(data["text"]) == [f"actor {i} done" for i in range(3)]
+        # a single writer, the parent
+        assert len(list(tmp_path.glob("*.pkl"))) == 1
+
+    def test_spawn(self, tmp_path):
+        rlog.init("test_fwd", path=tmp_path, append_pickle=True, mp_forwarding="spawn")
+        ctx = multiprocessing.get_context("spawn")
+        actor = ctx.Process(target=_spawned_actor, args=(rlog.worker_config(),))
+        actor.start()
+        actor.join()
+        rlogger.FORWARDING["listener"].stop()
+
+        assert len(_read_steps(tmp_path)["actor"]) == 100
+
+
+class TestForwardingHandler:
+    def test_batches(self):
+        sent = ListHandler()
+
+        class Queue:
+            def put(self, batch):
+                sent.records.append(batch)
+
+        handler = ForwardingHandler(Queue(), batch_size=4, flush_secs=3600)
+        logger = logging.getLogger("test_fwd_batches")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        logger.addHandler(handler)
+        for i in range(9):
+            logger.info("msg %d", i)
+        logger.error("boom %d", 9)
+
+        # the first record is sent right away, then batches of 4, and errors
+        assert [len(batch) for batch in sent.records] == [1, 4, 4, 1]
+        assert sent.records[-1][0].msg == "boom 9"
+        assert sent.records[-1][0].args is None
+        handler.close()
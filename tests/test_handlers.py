@@ -0,0 +1,298 @@
+import logging
+import multiprocessing
+import pickle
+import threading
+import time
+
+import pytest
+
+import rlog
+from rlog.handlers import (
+    AsyncHandler,
+    BufferedFileHandler,
+    ColumnarHandler,
+    PickleHandler,
+    handle_batch,
+    read_columns,
+    read_pickle,
+)
+
+
+def _trace_record(name, **msg):
+    return logging.makeLogRecord(
+        {"name": name, "msg": msg, "levelno": 15, "levelname": "TRACE"}
+    )
+
+
+def _info_record(name, msg):
+    return logging.makeLogRecord(
+        {"name": name, "msg": msg, "levelno": logging.INFO, "levelname": "INFO"}
+    )
+
+
+def _trace_in_child():
+    log = rlog.getLogger("test_async.child")
+    for step in range(20):
+        log.trace(step=step, loss=step / 10)
+
+
+def _info_in_child():
+    rlog.getLogger("test_bf.child").info("from child")
+
+
+class ListHandler(logging.Handler):
+    """Collects records, optionally waiting for `gate` before each one."""
+
+    def __init__(self, gate=None):
+        logging.Handler.__init__(self)
+        self.records = []
+        self.gate = gate
+
+    def emit(self, record):
+        if self.gate is not None:
+            self.gate.wait()
+        self.records.append(record)
+
+
+class TestPickleHandler:
+    @pytest.mark.parametrize("append", [False, True])
+    def test_layout(self, tmp_path, append):
+        handler = PickleHandler(tmp_path, timestamp=0, append=append)
+        handler.handle(_trace_record("dqn.train", step=1, loss=0.5))
+        handler.handle(_info_record("dqn.train", "hello"))
+        handler.handle(_trace_record("dqn.train", step=4, loss=0.25, err=[1, 2]))
+        handler.close()
+
+        data = read_pickle(tmp_path / "0_dqn_train.pkl")
+
+        assert [e["step"] for e in data["loss"]] == [1, 4]
+        assert [e["value"] for e in data["loss"]] == [0.5, 0.25]
+        assert [(e["step"], e["value"]) for e in data["err"]] == [(2, 1), (3, 2)]
+        assert data["text"] == ["hello"]
+
+    def test_append_modes_agree(self, tmp_path):
+        records = [_trace_record("dqn", step=i, loss=i / 2) for i in range(10)]
+        for append in (False, True):
+            (tmp_path / str(append)).mkdir()
+            handler = PickleHandler(tmp_path / str(append), timestamp=0, append=append)
+            for record in records:
+                handler.handle(record)
+            handler.close()
+
+        rewritten = read_pickle(tmp_path / "False" / "0_dqn.pkl")
+        appended = read_pickle(tmp_path / "True" / "0_dqn.pkl")
+        assert rewritten == appended
+
+    def test_append_writes_chunks(self, tmp_path):
+        handler = PickleHandler(tmp_path, timestamp=0, append=True)
+        for i in range(3):
+            handler.handle(_trace_record("dqn", step=i, loss=i))
+        handler.close()
+
+        with open(tmp_path / "0_dqn.pkl", "rb") as f:
+            first = pickle.load(f)
+        assert list(first) == ["loss"]
+        assert len(first["loss"]) == 1
+
+    def test_read_truncated(self, tmp_path):
+        handler = PickleHandler(tmp_path, timestamp=0, append=True)
+        for i in range(3):
+            handler.handle(_trace_record("dqn", step=i, loss=i))
+        handler.close()
+
+        path = tmp_path / "0_dqn.pkl"
+        path.write_bytes(path.read_bytes()[:-5])
+        assert [e["step"] for e in read_pickle(path)["loss"]] == [0, 1]
+
+    def test_emit_batch_saves_once(self, tmp_path, monkeypatch):
+        handler = PickleHandler(tmp_path, timestamp=0)
+        saved = []
+        save = handler._save
+        monkeypatch.setattr(
+            handler, "_save", lambda name, data: saved.append(name) or save(name, data)
+        )
+        records = [_trace_record(name, step=1, loss=1) for name in ("a", "b", "a")]
+        handle_batch(handler, records + [_info_record("a", "hello")])
+        handler.close()
+
+        assert saved == ["a", "b"]
+        data = read_pickle(tmp_path / "0_a.pkl")
+        assert len(data["loss"]) == 2
+        assert data["text"] == ["hello"]
+
+
+class TestBufferedFileHandler:
+    def test_flushes(self, tmp_path):
+        path = tmp_path / "log.log"
+        handler = BufferedFileHandler(path, capacity=20, flush_secs=3600)
+        handler.handle(_info_record("dqn", "hello"))
+        assert not path.exists()
+
+        handler.handle(_info_record("dqn", "a longer line"))
+        assert path.read_text() == "hello\na longer line\n"
+
+        handler.handle(_info_record("dqn", "info"))
+        warning = _info_record("dqn", "warning")
+        warning.levelno = logging.WARNING
+        handler.handle(warning)
+        assert path.read_text().endswith("info\nwarning\n")
+
+        handler.handle(_info_record("dqn", "last"))
+        handler.close()
+        assert path.read_text().endswith("last\n")
+
+    def test_flushes_after_flush_secs(self, tmp_path):
+        path = tmp_path / "log.log"
+        handler = BufferedFileHandler(path, flush_secs=0.05)
+        handler.handle(_info_record("dqn", "hello"))
+        assert not path.exists()
+
+        time.sleep(0.5)
+        assert path.read_text() == "hello\n"
+        handler.close()
+
+    def test_fork(self, tmp_path):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            pytest.skip("needs fork")
+        rlog.init("test_bf", path=tmp_path)
+        rlog.info("from parent")
+        child = multiprocessing.get_context("fork").Process(target=_info_in_child)
+        child.start()
+        child.join()
+        rlog.flush()
+
+        # the parent's buffered line is written once, by the parent
+        lines = (tmp_path / "log.log").read_text().splitlines()
+        assert sorted(line.split(": ")[-1] for line in lines) == [
+            "from child",
+            "from parent",
+        ]
+
+
+class TestColumnarHandler:
+    def test_columns(self, tmp_path):
+        np = pytest.importorskip("numpy")
+
+        handler = ColumnarHandler(tmp_path, timestamp=0)
+        handler.handle(_trace_record("dqn.train", step=1, loss=0.5))
+        handler.handle(_info_record("dqn.train", "not stored"))
+        handler.handle(_trace_record("dqn.train", step=4, loss=0.25, **{"R/ep": 3}))
+        handler.handle(_trace_record("dqn.train", step=8, err=[1.0, 2.0]))
+        handler.close()
+
+        data = read_columns(tmp_path / "0_dqn_train.cols")
+
+        assert set(data) == {"loss", "R/ep", "err"}
+        assert data["loss"]["step"].dtype == np.int64
+        np.testing.assert_array_equal(data["loss"]["step"], [1, 4])
+        np.testing.assert_array_equal(data["loss"]["value"], [0.5, 0.25])
+        np.testing.assert_array_equal(data["R/ep"]["value"], [3.0])
+        np.testing.assert_array_equal(data["err"]["step"], [6, 7])
+        np.testing.assert_array_equal(data["err"]["value"], [1.0, 2.0])
+        assert len(data["err"]["time"]) == 2
+
+    def test_dict_values(self, tmp_path):
+        pytest.importorskip("numpy")
+
+        handler = ColumnarHandler(tmp_path, timestamp=0)
+        handler.handle(_trace_record("dqn", step=1, td_err={"p50": 0.5, "p99": 2}))
+        handler.close()
+
+        data = read_columns(tmp_path / "0_dqn.cols")
+        assert set(data) == {"td_err/p50", "td_err/p99"}
+        assert data["td_err/p99"]["value"].tolist() == [2.0]
+
+    def test_float32_values(self, tmp_path):
+        np = pytest.importorskip("numpy")
+
+        handler = ColumnarHandler(tmp_path, timestamp=0, dtype="float32")
+        handler.handle(_trace_record("dqn", step=1, loss=0.5))
+        handler.close()
+
+        data = read_columns(tmp_path / "0_dqn.cols", mmap=False)
+        assert data["loss"]["value"].dtype == np.float32
+
+
+class TestAsyncHandler:
+    def test_order_and_flush(self):
+        target = ListHandler()
+        handler = AsyncHandler(target, batch_size=4)
+        for i in range(100):
+            handler.handle(_trace_record("dqn", step=i))
+        handler.flush()
+
+        assert [r.msg["step"] for r in target.records] == list(range(100))
+        handler.close()
+
+    def test_respects_handler_levels(self):
+        target = ListHandler()
+        target.setLevel(logging.INFO)
+        handler = AsyncHandler(target)
+        handler.handle(_trace_record("dqn", step=1))
+        handler.handle(_info_record("dqn", "hello %s"))
+        handler.close()
+
+        assert [r.msg for r in target.records] == ["hello %s"]
+
+    def test_drop_oldest(self):
+        gate = threading.Event()
+        target = ListHandler(gate)
+        handler = AsyncHandler(target, maxsize=2, batch_size=1, policy="drop-oldest")
+        handler.handle(_trace_record("dqn", step=0))
+        # wait for the writer to pick the first record and block on the gate
+        while handler._queue.qsize():
+            pass
+        for i in range(1, 6):
+            handler.handle(_trace_record("dqn", step=i))
+        gate.set()
+        handler.close()
+
+        assert [r.msg["step"] for r in target.records] == [0, 4, 5]
+        assert handler.dropped == 3
+
+    def test_sample(self):
+        gate = threading.Event()
+        target = ListHandler(gate)
+        handler = AsyncHandler(
+            target, maxsize=2, batch_size=1, policy="sample", sample_every=2
+        )
+        handler.handle(_trace_record("dqn", step=0))
+        while handler._queue.qsize():
+            pass
+        handler.handle(_trace_record("dqn", step=1))
+        handler.handle(_trace_record("dqn", step=2))
+        handler.handle(_trace_record("dqn", step=3))  # dropped
+        gate.set()
+        handler.handle(_trace_record("dqn", step=4))  # kept, waits for room
+        handler.close()
+
+        assert [r.msg["step"] for r in target.records] == [0, 1, 2, 4]
+        assert handler.dropped == 1
+
+    def test_init_async_io(self, tmp_path):
+        rlog.init("test_async", path=tmp_path, timestamp=0, async_io=True)
+        log = rlog.getLogger("test_async.train")
+        for step in range(10):
+            log.trace(step=step, loss=step / 10)
+        rlog.flush()
+
+        data = read_pickle(tmp_path / "0_test_async_train.pkl")
+        assert [e["step"] for e in data["loss"]] == list(range(10))
+        rlog.getRootLogger().handlers[-1].close()
+
+    def test_fork(self, tmp_path):
+        if "fork" not in multiprocessing.get_all_start_methods():
+            pytest.skip("needs fork")
+        rlog.init(
+            "test_async", path=tmp_path, timestamp=0, async_io=True, queue_size=10
+        )
+        child = multiprocessing.get_context("fork").Process(
+            target=_trace_in_child, daemon=True
+        )
+        child.start()
+        child.join(timeout=10)
+        rlog.getRootLogger().handlers[-1].close()
+
+        assert child.exitcode == 0
+        data = read_pickle(tmp_path / "0_test_async_child.pkl")
+        assert [e["step"] for e in data["loss"]] == list(range(20))
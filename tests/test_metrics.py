@@ -0,0 +1,471 @@
+import math
+import pickle
+import random
+
+import pytest
+
+from rlog.metrics import (
+    Accumulator,
+    ArrayAccumulator,
+    AvgMetric,
+    EpisodicMetric,
+    EWMAvgMetric,
+    FPSMetric,
+    MaxMetric,
+    QuantileMetric,
+    SumMetric,
+    TDigest,
+    TimerMetric,
+    ValueMetric,
+    WindowAvgMetric,
+    WindowEpisodicMetric,
+    clip,
+)
+
+
+def _dqn_metrics():
+    return (
+        SumMetric("ep_cnt", resetable=False, metargs=["done"]),
+        AvgMetric("R_per_ep", metargs=["reward", "done"]),
+        AvgMetric("R_per_step", metargs=["reward", 1]),
+        AvgMetric("rw_per_ep", metargs=["clip(reward)", "done"]),
+        MaxMetric("max_R", metargs=["reward"]),
+        EpisodicMetric("ep_R", metargs=["reward", "done"]),
+    )
+
+
+class TestAccumulator:
+    def test_trace(self):
+        acc = Accumulator(*_dqn_metrics())
+        rng = random.Random(0)
+
+        rewards, dones = [], []
+        for _ in range(1000):
+            reward, done = rng.gauss(0, 3), rng.random() < 0.05
+            acc.trace(reward=reward, done=done)
+            rewards.append(reward)
+            dones.append(done)
+
+        summary = acc.summarize()
+        assert summary["ep_cnt"] == sum(dones)
+        assert summary["R_per_ep"] == pytest.approx(sum(rewards) / sum(dones))
+        assert summary["R_per_step"] == pytest.approx(sum(rewards) / len(rewards))
+        assert summary["rw_per_ep"] == pytest.approx(
+            sum(clip(r) for r in rewards) / sum(dones)
+        )
+        assert summary["max_R"] == max(rewards)
+
+    def test_only_received_keys(self):
+        acc = Accumulator(
+            SumMetric("frames", metargs=["frame_no"]),
+            ValueMetric("loss", metargs=["loss"]),
+        )
+        acc.trace(frame_no=4)
+        acc.trace(loss=0.5)
+        acc.trace(loss=0.25, frame_no=4)
+
+        summary = acc.summarize()
+        assert summary["frames"] == 8
+        assert summary["loss"] == [0.5, 0.25]
+
+    def test_function_metarg_alone(self):
+        acc = Accumulator(SumMetric("clipped", metargs=["clip(reward)"]))
+        acc.trace(reward=7)
+        acc.trace(reward=-0.5)
+
+        assert acc.summarize()["clipped"] == 0.5
+
+    def test_missing_metarg(self):
+        acc = Accumulator(AvgMetric("R_per_ep", metargs=["reward", "done"]))
+        with pytest.raises(KeyError):
+            acc.trace(reward=1)
+
+    def test_add_metrics_recompiles(self):
+        acc = Accumulator(SumMetric("frames", metargs=["frame_no"]))
+        acc.trace(frame_no=1, loss=0.5)
+        acc.add_metrics(ValueMetric("loss", metargs=["loss"]))
+        acc.trace(frame_no=1, loss=0.25)
+
+        summary = acc.summarize()
+        assert summary["frames"] == 2
+        assert summary["loss"] == [0.25]
+
+
+class TestArrayAccumulator:
+    @staticmethod
+    def _metrics():
+        return (
+            *_dqn_metrics(),
+            FPSMetric("fps", metargs=["frame_no"]),
+            AvgMetric("R_alive", metargs=["reward * (1 - done)", 1]),
+        )
+
+    def test_matches_python_backend(self):
+        pytest.importorskip("numpy")
+        rng = random.Random(0)
+        python = Accumulator(*self._metrics())
+        arrays = ArrayAccumulator(*self._metrics())
+
+        for _ in range(3):
+            for _ in range(300):
+                reward, done = rng.gauss(0, 3), rng.random() < 0.05
+                python.trace(reward=reward, done=done, frame_no=1)
+                arrays.trace(reward=reward, done=done, frame_no=1)
+            arrays.trace(frame_no=1)
+            python.trace(frame_no=1)
+
+            expected, summary = python.summarize(), arrays.summarize()
+            assert summary.keys() == expected.keys()
+            for name in ("ep_cnt", "R_per_ep", "R_per_step", "rw_per_ep", "max_R"):
+                assert summary[name] == pytest.approx(expected[name])
+            assert summary["ep_R"] == pytest.approx(expected["ep_R"])
+            python.reset()
+            arrays.reset()
+
+    def test_views(self):
+        pytest.importorskip("numpy")
+        avg = AvgMetric("R", metargs=["reward", 1])
+        acc = ArrayAccumulator(avg, MaxMetric("max_R", metargs=["reward"]))
+        acc.trace(reward=1.0)
+        avg.accumulate(3.0, 1)
+        assert avg.value == 2.0
+        assert acc.summarize() == {"R": 2.0, "max_R": 1.0}
+        assert repr(avg) == "AvgMetric::R"
+
+        acc.reset()
+        assert not avg.updated
+        assert acc.state()["max_R"] == (-math.inf, False)
+
+    def test_replace_metric(self):
+        pytest.importorskip("numpy")
+        acc = ArrayAccumulator(
+            AvgMetric("R", metargs=["reward", 1]), SumMetric("n", metargs=["reward"])
+        )
+        acc.trace(reward=1.0)
+        acc.add_metrics(MaxMetric("R", metargs=["reward"]))
+        acc.trace(reward=3.0)
+        acc.trace(reward=2.0)
+        assert acc.summarize() == {"R": 3.0, "n": 6.0}
+
+        acc.add_metrics(EpisodicMetric("n", metargs=["reward", "done"]))
+        acc.trace(reward=4.0, done=True)
+        assert acc.summarize() == {"R": 4.0, "n": 4.0}
+
+
+class TestMerge:
+    @staticmethod
+    def _metrics():
+        return (
+            SumMetric("ep_cnt", metargs=["done"]),
+            AvgMetric("R_per_ep", metargs=["reward", "done"]),
+            MaxMetric("max_R", metargs=["reward"]),
+            EpisodicMetric("ep_R", metargs=["reward", "done"]),
+            ValueMetric("R", metargs=["reward"]),
+            QuantileMetric("q_R", metargs=["reward"], quantiles=(0, 1)),
+            FPSMetric("fps", metargs=["frame_no"]),
+            EWMAvgMetric("ewm_R", metargs=["reward", "done"]),
+            TimerMetric("t", metargs=["frame_no"]),
+        )
+
+    def test_merge_workers(self):
+        rng = random.Random(0)
+        steps = [(rng.gauss(0, 1), rng.random() < 0.1) for _ in range(400)]
+        single = Accumulator(*self._metrics())
+        learner = Accumulator(*self._metrics())
+        workers = [Accumulator(*self._metrics()) for _ in range(4)]
+
+        for i, (reward, done) in enumerate(steps):
+            single.trace(reward=reward, done=done, frame_no=1)
+            # each worker gets whole episodes, ending on the same steps
+            workers[i // 100].trace(reward=reward, done=done, frame_no=1)
+
+        states = [pickle.loads(pickle.dumps(w.state())) for w in workers]
+        learner.merge(*states)
+
+        expected, summary = single.summarize(), learner.summarize()
+        assert summary["ep_cnt"] == expected["ep_cnt"]
+        assert summary["R_per_ep"] == pytest.approx(expected["R_per_ep"])
+        assert summary["max_R"] == expected["max_R"]
+        assert summary["R"] == expected["R"]
+        assert summary["q_R"] == expected["q_R"]
+        assert summary["ewm_R"] == pytest.approx(expected["ewm_R"])
+        assert summary["t"] == expected["t"]
+        assert learner.metrics["fps"]._val == 400
+        assert learner.metrics["fps"]._start == min(
+            w.metrics["fps"]._start for w in workers
+        )
+
+    def test_merge_not_updated(self):
+        learner = Accumulator(*self._metrics())
+        learner.merge(Accumulator(*self._metrics()).state())
+        assert learner.summarize() == {}
+
+
+class TestValueMetric:
+    def test_unbounded(self):
+        metric = ValueMetric("v")
+        for i in range(10):
+            metric.accumulate(i)
+        assert metric.value == list(range(10))
+
+    def test_ring(self):
+        metric = ValueMetric("v", capacity=4)
+        for i in range(3):
+            metric.accumulate(i)
+        assert metric.value == [0, 1, 2]
+        for i in range(3, 10):
+            metric.accumulate(i)
+        assert metric.value == [6, 7, 8, 9]
+
+        metric.reset()
+        assert not metric.updated
+        metric.accumulate(1.5)
+        assert metric.value == [1.5]
+
+    def test_reservoir(self):
+        random.seed(0)
+        counts = [0] * 100
+        for _ in range(200):
+            metric = ValueMetric("v", capacity=10, mode="reservoir")
+            for i in range(100):
+                metric.accumulate(i)
+            assert len(set(metric.value)) == 10
+            for v in metric.value:
+                counts[int(v)] += 1
+
+        # every value is kept with probability 10 / 100
+        assert sum(counts[:50]) == pytest.approx(sum(counts[50:]), rel=0.2)
+
+    def test_wrong_mode(self):
+        with pytest.raises(ValueError):
+            ValueMetric("v", capacity=10, mode="last")
+
+
+class TestWindowMetrics:
+    def test_window_avg(self):
+        rng = random.Random(0)
+        metric = WindowAvgMetric("loss", window=7)
+        values = []
+        for _ in range(100):
+            values.append(rng.gauss(0, 1))
+            metric.accumulate(values[-1])
+            window = values[-7:]
+            assert metric.value["mean"] == pytest.approx(sum(window) / len(window))
+            assert metric.value["max"] == max(window)
+            assert metric.value["min"] == min(window)
+
+        metric.reset()
+        assert metric.updated
+
+    def test_window_episodic(self):
+        acc = Accumulator(WindowEpisodicMetric("R", window=3, metargs=["r", "done"]))
+        for ret in (1, 2, 3, 4):
+            for _ in range(ret - 1):
+                acc.trace(r=1, done=False)
+            acc.trace(r=1, done=True)
+        assert acc.summarize()["R"] == {"mean": 3.0, "max": 4.0, "min": 2.0}
+
+    def test_window_episodic_batch(self):
+        np = pytest.importorskip("numpy")
+        metric = WindowEpisodicMetric("R", window=10)
+        metric.accumulate_batch(np.array([1.0, 2.0]), np.array([0, 1]))
+        metric.accumulate_batch(np.array([3.0, 4.0]), np.array([1, 0]))
+        # episodes of 1 + 3 and of 2
+        assert metric.value == {"mean": 3.0, "max": 4.0, "min": 2.0}
+
+
+class TestTimerMetric:
+    def test_value(self):
+        metric = TimerMetric("t")
+        for ns in (1_000_000, 3_000_000, 2_000_000):
+            metric.accumulate(ns)
+        assert metric.value == {"mean": 2.0, "max": 3.0, "total": 6.0, "count": 3}
+
+        metric.reset()
+        assert metric.value == {"mean": 0.0, "max": 0.0, "total": 0.0, "count": 0}
+
+
+class TestQuantileMetric:
+    def test_quantiles(self):
+        rng = random.Random(0)
+        values = [rng.gauss(0, 1) for _ in range(50_000)]
+        metric = QuantileMetric("td_err", quantiles=(0.01, 0.5, 0.99))
+        for v in values:
+            metric.accumulate(v)
+
+        values.sort()
+        summary = metric.value
+        assert list(summary) == ["p1", "p50", "p99"]
+        assert summary["p1"] == pytest.approx(values[500], abs=0.02)
+        assert summary["p50"] == pytest.approx(values[25_000], abs=0.02)
+        assert summary["p99"] == pytest.approx(values[49_500], abs=0.02)
+
+    def test_constant_size(self):
+        digest = TDigest(compression=50)
+        for i in range(100_000):
+            digest.add(i)
+        digest.quantile(0.5)
+        assert len(digest.means) <= 50
+        assert sum(digest.weights) == digest.count == 100_000
+
+    def test_small_samples_are_exact(self):
+        metric = QuantileMetric("v", quantiles=(0, 1))
+        for v in (3, 1, 2):
+            metric.accumulate(v)
+        assert metric.value == {"p0": 1, "p100": 3}
+
+    def test_histogram(self):
+        metric = QuantileMetric("v", tb_type="histogram", bins=10)
+        for i in range(1000):
+            metric.accumulate(i)
+
+        hist = metric.value
+        assert (hist["min"], hist["max"], hist["num"]) == (0, 999, 1000)
+        assert hist["sum"] == sum(range(1000))
+        assert len(hist["bucket_limits"]) == len(hist["bucket_counts"]) == 10
+        assert sum(hist["bucket_counts"]) == pytest.approx(1000)
+        assert hist["bucket_counts"][0] == pytest.approx(100, rel=0.1)
+
+    def test_reset(self):
+        metric = QuantileMetric("v")
+        metric.accumulate(1)
+        metric.reset()
+        assert not metric.updated
+        metric.accumulate(5)
+        assert metric.value["p50"] == 5
+
+
+class FakeTensor:
+    """A scalar tensor that counts its copies to the host."""
+
+    items = 0
+
+    def __init__(self, val, grad=True):
+        self.val, self.grad = val, grad
+
+    def _wrap(self, val):
+        return FakeTensor(val.val if isinstance(val, FakeTensor) else val, self.grad)
+
+    def __add__(self, other):
+        return self._wrap(self.val + self._wrap(other).val)
+
+    __radd__ = __add__
+
+    def __truediv__(self, other):
+        return self._wrap(self.val / other)
+
+    def __bool__(self):
+        raise AssertionError("compared on the host")
+
+    __lt__ = __gt__ = __ge__ = __le__ = __bool__
+
+    def detach(self):
+        return FakeTensor(self.val, grad=False)
+
+    def item(self):
+        FakeTensor.items += 1
+        return self.val
+
+
+class TestTensors:
+    def test_deferred_conversion(self, monkeypatch):
+        monkeypatch.setattr(FakeTensor, "items", 0)
+        acc = Accumulator(
+            SumMetric("loss_sum", metargs=["loss"]),
+            AvgMetric("loss", metargs=["loss", 1]),
+            ValueMetric("losses", metargs=["loss"]),
+        )
+        for i in range(10):
+            acc.trace(loss=FakeTensor(float(i)))
+        assert FakeTensor.items == 0
+        assert not acc.metrics["loss_sum"]._val.grad
+
+        summary = acc.summarize()
+        assert summary["loss_sum"] == 45.0
+        assert summary["loss"] == 4.5
+        assert summary["losses"] == [float(i) for i in range(10)]
+        assert FakeTensor.items == 12
+
+    def test_max_of_numpy_scalars(self):
+        np = pytest.importorskip("numpy")
+        metric = MaxMetric("max")
+        for val in (1.0, 3.0, 2.0):
+            metric.accumulate(np.float32(val))
+        assert metric.value == 3.0
+        assert type(metric.value) is float
+
+
+class TestTraceBatch:
+    @staticmethod
+    def _steps(n_envs=16, n_steps=200, seed=0):
+        np = pytest.importorskip("numpy")
+        rng = np.random.default_rng(seed)
+        rewards = rng.normal(0, 3, size=(n_steps, n_envs))
+        dones = rng.random(size=(n_steps, n_envs)) < 0.05
+        return rewards, dones
+
+    def test_matches_scalar_path(self):
+        rewards, dones = self._steps()
+
+        def metrics():
+            return (
+                *_dqn_metrics()[:5],
+                SumMetric("int_R", metargs=["int(reward)"]),
+                FPSMetric("fps", metargs=["frame_no"]),
+                ValueMetric("R", metargs=["reward"]),
+                EWMAvgMetric("ewm_R", metargs=["reward", "done"]),
+            )
+
+        scalar, batch = Accumulator(*metrics()), Accumulator(*metrics())
+
+        for reward, done in zip(rewards, dones, strict=True):
+            for r, d in zip(reward.tolist(), done.tolist(), strict=True):
+                scalar.trace(reward=r, done=d, frame_no=1)
+            batch.trace_batch(reward=reward, done=done, frame_no=1)
+
+        expected, summary = scalar.summarize(), batch.summarize()
+        for name in ("R_per_ep", "R_per_step", "rw_per_ep", "max_R", "int_R"):
+            assert summary[name] == expected[name]
+        assert summary["ep_cnt"] == expected["ep_cnt"]
+        assert summary["R"] == expected["R"]
+        assert summary["ewm_R"] == expected["ewm_R"]
+        assert batch.metrics["fps"]._val == scalar.metrics["fps"]._val
+
+    def test_scalar_first(self):
+        rewards, dones = self._steps(n_steps=1)
+        acc = Accumulator(
+            SumMetric("frames", metargs=["frame_no"]),
+            SumMetric("R", metargs=["reward"]),
+        )
+        acc.trace_batch(frame_no=1, reward=rewards[0], done=dones[0])
+        assert acc.summarize()["frames"] == 16
+        assert acc.summarize()["R"] == pytest.approx(rewards[0].sum())
+
+    def test_scalars_only(self):
+        pytest.importorskip("numpy")
+        acc = Accumulator(
+            SumMetric("frames", metargs=["frame_no"]),
+            EpisodicMetric("ep_R", metargs=["reward", "done"]),
+        )
+        acc.trace_batch(frame_no=1, reward=5, done=True)
+        assert acc.summarize() == {"frames": 1, "ep_R": 5}
+
+    def test_episodic_per_env(self):
+        rewards, dones = self._steps()
+        acc = Accumulator(EpisodicMetric("ep_R", metargs=["reward", "done"]))
+
+        total, episodes = 0, 0
+        partials = [0] * rewards.shape[1]
+        rewards, dones = rewards.tolist(), dones.tolist()
+        for reward, done in zip(rewards, dones, strict=True):
+            acc.trace_batch(reward=reward, done=done)
+            # the scalar path, with one partial return per environment
+            for i, (r, d) in enumerate(zip(reward, done, strict=True)):
+                if d:
+                    total += partials[i] + r
+                    episodes += 1
+                    partials[i] = 0
+                else:
+                    partials[i] += r
+
+        assert acc.summarize()["ep_R"] == total / episodes
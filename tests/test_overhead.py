@@ -0,0 +1,116 @@
+import logging
+
+import pytest
+
+import rlog
+from rlog.metrics import Accumulator, ArrayAccumulator
+from rlog.overhead import OverheadMonitor
+from rlog.rlogger import OVERHEAD, RLogger
+
+from .test_handlers import ListHandler
+
+
+@pytest.fixture
+def logger():
+    rlog.init("test_overhead")
+    log = rlog.getLogger("test_overhead.train")
+    log.addMetrics(rlog.AvgMetric("R", metargs=["reward", 1]))
+    handler = ListHandler()
+    handler.setLevel(logging.TRACE)
+    log.addHandler(handler)
+    yield log, handler
+    rlog.disable_overhead()
+
+
+class TestOverheadMonitor:
+    def test_nested_calls_count_once(self):
+        class Foo:
+            def outer(self):
+                self.inner()
+
+            def inner(self):
+                pass
+
+        monitor = OverheadMonitor()
+        monitor.enable((Foo, "outer", "outer"), (Foo, "inner", "inner"))
+        Foo().outer()
+        assert monitor.calls == {"outer": 1, "inner": 1}
+        assert monitor.total == monitor.times["outer"] >= monitor.times["inner"]
+
+        monitor.disable()
+        assert not hasattr(Foo.outer, "__wrapped__")
+
+
+class TestOverhead:
+    def test_measures_hot_paths(self, logger):
+        log, _ = logger
+        rlog.enable_overhead()
+        for _ in range(10):
+            log.put(reward=1)
+        log.traceAndLog(10)
+
+        summary = rlog.overhead()
+        for name in ("put", "summarize", "format", "trace", "emit/ListHandler"):
+            assert summary[name] > 0
+        assert OVERHEAD.calls["put"] == 10
+        assert summary["total"] <= summary["elapsed"]
+
+    def test_array_backend(self):
+        pytest.importorskip("numpy")
+        rlog.init("test_overhead_array")
+        log = rlog.getLogger("test_overhead_array.train")
+        log.addMetrics(rlog.AvgMetric("R", metargs=["reward", 1]), backend="array")
+        rlog.enable_overhead()
+        try:
+            for _ in range(10):
+                log.put(reward=1)
+            log.summarize()
+            assert OVERHEAD.calls["put"] == 10
+            assert OVERHEAD.calls["summarize"] == 1
+        finally:
+            rlog.disable_overhead()
+        assert ArrayAccumulator.trace is not Accumulator.trace
+        assert not hasattr(ArrayAccumulator.trace, "__wrapped__")
+
+    def test_flush_all(self, logger):
+        log, _ = logger
+        rlog.enable_overhead()
+        log.put(reward=1)
+        rlog.flush_all(1)
+        handlers = [h for h in log.handlers if isinstance(h, ListHandler)]
+        assert OVERHEAD.calls["emit/ListHandler"] == len(handlers)
+        assert rlog.overhead()["emit/ListHandler"] > 0
+
+    def test_ignores_other_loggers(self, logger):
+        other = logging.getLogger("test_overhead_other")
+        other.propagate = False
+        handler = ListHandler()
+        other.addHandler(handler)
+        rlog.enable_overhead()
+        other.warning("not from rlog")
+        other.removeHandler(handler)
+
+        assert handler.records
+        assert "emit/ListHandler" not in rlog.overhead()
+
+    def test_disable_restores(self, logger):
+        log, _ = logger
+        trace, put = RLogger.trace, Accumulator.trace
+        rlog.enable_overhead()
+        rlog.disable_overhead()
+        assert RLogger.trace is trace
+        assert Accumulator.trace is put
+        log.put(reward=1)
+        assert "put" not in rlog.overhead()
+
+    def test_trace_overhead(self, logger):
+        log, handler = logger
+        rlog.enable_overhead()
+        log.put(reward=1)
+        rlog.trace_overhead(1, logger=log)
+
+        msg = handler.records[-1].msg
+        assert msg["step"] == 1
+        assert msg["rlog/overhead/put"] > 0
+        assert 0 < msg["rlog/overhead/fraction"] < 1
+        assert "put" not in rlog.overhead()
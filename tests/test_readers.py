@@ -0,0 +1,69 @@
+import logging
+
+import pytest
+
+import rlog
+from rlog.handlers import ColumnarHandler, PickleHandler
+from rlog.readers import load, load_logger
+
+np = pytest.importorskip("numpy")
+
+
+def _write_run(run_dir, handler_cls, **kwargs):
+    run_dir.mkdir(exist_ok=True)
+    handler = handler_cls(run_dir, timestamp=1000, **kwargs)
+    for step in range(1, 4):
+        msg = {"step": step * 10, "loss": step / 2, "q": {"p50": step}, "err": [1, 2]}
+        handler.handle(
+            logging.makeLogRecord(
+                {"name": "dqn.train", "msg": msg, "levelno": 15, "levelname": "TRACE"}
+            )
+        )
+    handler.handle(logging.makeLogRecord({"name": "dqn.train", "msg": "hello"}))
+    handler.close()
+
+
+class TestLoad:
+    def test_sweep(self, tmp_path):
+        for i in range(3):
+            _write_run(tmp_path / f"lr_{i}", PickleHandler, append=i % 2 == 0)
+
+        runs = load(tmp_path / "lr_*", as_frame=False, processes=2)
+        assert sorted(runs) == [str(tmp_path / f"lr_{i}") for i in range(3)]
+
+        data = runs[str(tmp_path / "lr_0")]["dqn_train"]
+        assert sorted(data) == ["err", "loss", "q/p50"]
+        assert data["loss"]["step"].tolist() == [10, 20, 30]
+        assert data["loss"]["value"].tolist() == [0.5, 1.0, 1.5]
+        assert data["err"]["step"].tolist() == [8, 9, 18, 19, 28, 29]
+        assert data["q/p50"]["value"].dtype == np.float64
+
+    def test_cache(self, tmp_path):
+        _write_run(tmp_path, PickleHandler)
+        source = tmp_path / "1000_dqn_train.pkl"
+        first = load_logger(source)
+        assert (tmp_path / "1000_dqn_train.pkl.npz").exists()
+
+        cached = load(tmp_path, as_frame=False)[str(tmp_path)]["dqn_train"]
+        assert cached.keys() == first.keys()
+        assert cached["loss"]["value"].tolist() == first["loss"]["value"].tolist()
+
+        # a changed pickle invalidates the cache
+        _write_run(tmp_path, PickleHandler, append=True)
+        data = load_logger(source)
+        assert len(data["loss"]["step"]) == 6
+
+    def test_prefers_columns(self, tmp_path):
+        _write_run(tmp_path, PickleHandler)
+        _write_run(tmp_path, ColumnarHandler)
+
+        data = rlog.load(tmp_path, as_frame=False)[str(tmp_path)]["dqn_train"]
+        assert not (tmp_path / "1000_dqn_train.pkl.npz").exists()
+        assert data["loss"]["value"].tolist() == [0.5, 1.0, 1.5]
+
+    def test_frames(self, tmp_path):
+        pytest.importorskip("pandas")
+        _write_run(tmp_path, PickleHandler)
+
+        frame = load(tmp_path, as_frame=True)[str(tmp_path)]["dqn_train"]["loss"]
+        assert list(frame.columns) == ["step", "value", "time"]
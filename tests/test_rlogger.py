@@ -1,7 +1,13 @@
+import logging
+import subprocess
+import sys
+
 import pytest
 
 import rlog
 
+from .test_handlers import ListHandler
+
 
 class TestRLogger:
     def test_init_basic(self):
@@ -75,3 +81,191 @@ class TestRLogger:
 
         with pytest.raises(TypeError):
             logger.traceAndLog(step=1)
+
+    def test_trace_without_trace_handlers(self, monkeypatch):
+        rlog.init("test_trace_fast")
+        # pytest captures the records of python's root logger
+        monkeypatch.setattr(rlog.getRootLogger(), "propagate", False)
+        logger = rlog.getLogger("test_trace_fast.train")
+        assert not logger.hasTraceHandlers()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("no record should be made")
+
+        monkeypatch.setattr(logger, "makeRecord", fail)
+        logger.trace(step=1, value=2.5)
+        logger.trace("Trace message")
+
+    def test_trace_with_trace_handlers(self, tmp_path):
+        rlog.init("test_trace_handlers", path=tmp_path, timestamp=0)
+        logger = rlog.getLogger("test_trace_handlers.train")
+        assert logger.hasTraceHandlers()
+
+        logger.propagate = False
+        assert not logger.hasTraceHandlers()
+
+    def test_disable_metrics(self):
+        rlog.init("test_disable")
+        logger = rlog.getLogger("test_disable")
+        logger.disableMetrics()
+        logger.addMetrics(rlog.SumMetric("frames", metargs=["frame_no"]))
+        logger.put(frame_no=1)
+        assert not logger.accumulator.metrics["frames"].updated
+
+        logger.enableMetrics()
+        logger.put(frame_no=1)
+        assert logger.summarize()["frames"] == 1
+
+    def test_span(self):
+        rlog.init("test_span")
+        logger = rlog.getLogger("test_span.train")
+
+        @logger.span("backward")
+        def backward():
+            pass
+
+        for _ in range(3):
+            with logger.span("env_step"):
+                pass
+            with logger.span("update"):
+                with logger.span("forward"):
+                    pass
+                backward()
+        backward()
+
+        summary = logger.summarize()
+        assert summary["env_step"]["count"] == 3
+        assert summary["update/forward"]["count"] == 3
+        assert summary["update/backward"]["count"] == 3
+        assert summary["backward"]["count"] == 1
+        assert summary["update"]["total"] >= summary["update/forward"]["total"]
+        assert logger.span("env_step") is logger.span("env_step")
+        assert not logger._open_spans
+
+    def test_array_backend(self):
+        pytest.importorskip("numpy")
+        rlog.init("test_backend")
+        logger = rlog.getLogger("test_backend.train")
+        logger.addMetrics(
+            rlog.SumMetric("frames", metargs=["frame_no"]), backend="array"
+        )
+        assert isinstance(logger.accumulator, rlog.ArrayAccumulator)
+        logger.put(frame_no=4)
+        assert logger.summarize()["frames"] == 4
+
+        with pytest.raises(ValueError):
+            rlog.getLogger("test_backend.eval").addMetrics(backend="numpy")
+
+    def test_flush_all(self, tmp_path):
+        rlog.init("test_flush_all", path=tmp_path, timestamp=0)
+        rlog.addMetrics(rlog.SumMetric("frames", metargs=["frame_no"]))
+        train = rlog.getLogger("test_flush_all.train")
+        train.addMetrics(rlog.AvgMetric("loss", metargs=["loss", 1]))
+        rlog.getLogger("test_flush_all.eval")  # no metrics, not summarized
+        rlog.put(frame_no=4)
+        train.put(loss=0.5)
+
+        summaries = rlog.flush_all(10)
+        assert list(summaries) == ["test_flush_all", "test_flush_all.train"]
+        assert summaries["test_flush_all"]["frames"] == 4
+        assert not train.accumulator.metrics["loss"].updated
+
+        data = rlog.read_pickle(tmp_path / "0_test_flush_all_train.pkl")
+        assert data["loss"][0]["step"] == 10
+        assert data["text"] == ["[000010] loss=0.50"]
+        rlog.flush()
+        assert "loss=0.50" in (tmp_path / "log.log").read_text()
+
+    def test_lazy_imports(self):
+        code = (
+            "import sys, rlog; rlog.init('lazy'); "
+            "print(sorted(m for m in sys.modules if m.startswith('rlog.'))); "
+            "print(rlog.handlers.PickleHandler, rlog.metrics.AvgMetric)"
+        )
+        out = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+        loaded, printed = out.splitlines()
+        for module in ("handlers", "metrics", "readers", "forwarding", "tensorboard"):
+            assert f"rlog.{module}" not in loaded
+        assert "PickleHandler" in printed and "AvgMetric" in printed
+        assert rlog.AvgMetric is rlog.metrics.AvgMetric
+        assert "PickleHandler" in dir(rlog)
+        with pytest.raises(AttributeError):
+            rlog.NoSuchMetric  # noqa: B018
+
+    def test_files_created_on_first_record(self, tmp_path):
+        rlog.init("test_lazy_files", path=tmp_path, columnar=True, tensorboard=True)
+        assert list(tmp_path.iterdir()) == []
+
+        rlog.info("hello")
+        rlog.trace(step=1, loss=0.5)
+        rlog.flush()
+        names = [p.name for p in tmp_path.iterdir()]
+        assert "log.log" in names
+        assert any(name.startswith("events.out.tfevents") for name in names)
+        assert any(name.endswith(".cols") for name in names)
+
+    def test_configure(self, tmp_path, capsys):
+        rlog.configure(
+            "test_configure",
+            rlog.console(prefix="> "),
+            rlog.PickleHandler(tmp_path, timestamp=0),
+            async_io=True,
+        )
+        root = rlog.getRootLogger()
+        assert [type(h).__name__ for h in root.handlers] == [
+            "StreamHandler",
+            "StreamHandler",
+            "AsyncHandler",
+        ]
+        rlog.info("hello")
+        rlog.trace(step=1, loss=0.5)
+        rlog.flush()
+        assert capsys.readouterr().out.startswith("> ")
+        data = rlog.read_pickle(tmp_path / "0_test_configure.pkl")
+        assert data["loss"][0]["value"] == 0.5
+        root.handlers[-1].close()
+
+    def test_schema_sent_once(self):
+        rlog.init("test_schema")
+        logger = rlog.getLogger("test_schema.train")
+        handler = ListHandler()
+        handler.handles_schemas = True
+        handler.setLevel(logging.TRACE)
+        logger.addHandler(handler)
+        logger.addMetrics(rlog.AvgMetric("R", metargs=["reward", 1]))
+        for step in (1, 2):
+            logger.put(reward=1)
+            logger.traceAndLog(step)
+        logger.addMetrics(rlog.MaxMetric("max_R", metargs=["reward"]))
+        logger.put(reward=1)
+        logger.traceAndLog(3)
+
+        schemas = [r.rlog_schema for r in handler.records if hasattr(r, "rlog_schema")]
+        assert [s["version"] for s in schemas] == [1, 2]
+        assert schemas[1]["metrics"]["max_R"] == {
+            "tb_type": "scalar",
+            "type": "MaxMetric",
+        }
+        traces = [r.msg for r in handler.records if isinstance(r.msg, dict)]
+        assert traces[-1] == {"step": 3, "R": 1.0, "max_R": 1}
+
+    def test_schema_only_to_handlers_using_it(self, tmp_path, capsys):
+        rlog.init("test_schema_debug", path=tmp_path, level=logging.DEBUG)
+        logger = rlog.getLogger("test_schema_debug.train")
+        handler = ListHandler()
+        handler.setLevel(logging.TRACE)
+        logger.addHandler(handler)
+        logger.addMetrics(rlog.AvgMetric("R", metargs=["reward", 1]))
+        logger.put(reward=1)
+        logger.traceAndLog(1)
+        logger.put(reward=1)
+        rlog.flush_all(2)
+        rlog.flush()
+
+        assert "Schema" not in capsys.readouterr().out
+        assert "Schema" not in (tmp_path / "log.log").read_text()
+        assert not any(hasattr(r, "rlog_schema") for r in handler.records)
+        data = rlog.read_pickle(next(tmp_path.glob("*_train.pkl")))
+        assert all("Schema" not in text for text in data["text"])
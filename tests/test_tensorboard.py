@@ -0,0 +1,102 @@
+import logging
+import struct
+
+import pytest
+
+from rlog.handlers import TensorboardHandler
+from rlog.tensorboard import EventFileWriter, crc32c, masked_crc32c
+
+
+def _read_records(file_path):
+    records = []
+    with open(file_path, "rb") as f:
+        while header := f.read(8):
+            (length,) = struct.unpack("<Q", header)
+            (header_crc,) = struct.unpack("<I", f.read(4))
+            data = f.read(length)
+            (data_crc,) = struct.unpack("<I", f.read(4))
+            assert header_crc == masked_crc32c(header)
+            assert data_crc == masked_crc32c(data)
+            records.append(data)
+    return records
+
+
+class TestEventFileWriter:
+    def test_crc32c(self):
+        # the check value of CRC-32C
+        assert crc32c(b"123456789") == 0xE3069283
+
+    def test_records(self, tmp_path):
+        writer = EventFileWriter(tmp_path)
+        writer.add_scalar("loss", 0.5, global_step=1)
+        writer.add_scalar_series("err", [1.0, 2.0, 3.0], 4)
+        writer.add_histogram("values", [1, 2, 2, 3], global_step=7)
+        writer.add_text("stdout", "hello", global_step=7)
+        writer.close()
+
+        records = _read_records(writer.file_path)
+        assert len(records) == 1 + 1 + 3 + 1 + 1
+        assert b"brain.Event:2" in records[0]
+        assert b"hello" in records[-1]
+
+    def test_buffered(self, tmp_path):
+        writer = EventFileWriter(tmp_path, flush_secs=3600)
+        size = writer.file_path.stat().st_size
+        writer.add_scalar("loss", 0.5, global_step=1)
+        assert writer.file_path.stat().st_size == size
+        writer.flush()
+        assert writer.file_path.stat().st_size > size
+        writer.close()
+
+
+class TestTensorboardHandler:
+    def test_read_back(self, tmp_path):
+        event_accumulator = pytest.importorskip(
+            "tensorboard.backend.event_processing.event_accumulator"
+        )
+
+        handler = TensorboardHandler(tmp_path)
+        schema = {"metrics": {"values": {"tb_type": "histogram"}}}
+        msg = {
+            "step": 10,
+            "loss": 0.5,
+            "err": [1.0, 2.0],
+            "q": {"p50": 3.0},
+            "values": [1.0, 2.0, 3.0],
+        }
+        for record in ({"msg": "schema", "rlog_schema": schema}, {"msg": msg}):
+            handler.handle(
+                logging.makeLogRecord(
+                    {"name": "dqn", "levelno": 15, "levelname": "TRACE", **record}
+                )
+            )
+        handler.close()
+
+        acc = event_accumulator.EventAccumulator(str(tmp_path))
+        acc.Reload()
+        assert [(e.step, e.value) for e in acc.Scalars("dqn/loss")] == [(10, 0.5)]
+        assert [e.step for e in acc.Scalars("dqn/err")] == [8, 9]
+        assert [e.value for e in acc.Scalars("dqn/q/p50")] == [3.0]
+        assert acc.Histograms("dqn/values")[0].histogram_value.num == 3
+
+    def test_schemas_per_process(self):
+        class Writer:
+            def __init__(self):
+                self.calls = []
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.calls.append((name, *args[:1]))
+
+        handler = TensorboardHandler(None)
+        handler.writer = Writer()
+        parent = {"metrics": {"values": {"tb_type": "histogram"}}}
+        worker = {"metrics": {"loss": {"tb_type": "scalar"}}}
+        for process, record in (
+            (1, {"msg": "schema", "rlog_schema": parent}),
+            (2, {"msg": "schema", "rlog_schema": worker}),
+            (1, {"msg": {"step": 1, "values": [1.0, 2.0]}}),
+        ):
+            record = {"name": "dqn", "levelno": 15, "process": process, **record}
+            handler.handle(logging.makeLogRecord({"levelname": "TRACE", **record}))
+
+        assert handler.writer.calls == [("add_histogram", "dqn/values")]